@@ -0,0 +1,153 @@
+"""
+Benchmark the scanner and the classifier on a synthetic project.
+
+Run from the repository root, with pyprojectsetup installed (or `src` on PYTHONPATH):
+
+    python -m benchmarks.run_benchmarks --files 2000 --output results/new.json
+    python -m benchmarks.run_benchmarks --files 2000 --compare results/old.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.stub_index import StubIndex
+from benchmarks.synthetic_repo import generate_project
+
+
+def get_version():
+    """Return the installed pyprojectsetup version and the git commit of the working tree (None when unknown)."""
+    try:
+        from importlib import metadata
+        version = metadata.version('pyprojectsetup')
+    except Exception:
+        version = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return version, commit
+
+
+def measure(function, repeat):
+    """Call function `repeat` times and return the timing statistics (seconds) and the last return value."""
+    timings = []
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = function()
+        timings.append(time.perf_counter() - start)
+    return {'repeat': repeat, 'min': min(timings), 'median': statistics.median(timings),
+            'mean': statistics.mean(timings), 'max': max(timings)}, value
+
+
+def run_benchmarks(project_params, latency=0.0, error_rate=0.0, repeat=5, classify_repeat=1):
+    """
+    Generate a synthetic project and time the scanner and the classifier on it.
+
+    Args:
+        project_params (dict): Keyword arguments of `generate_project` (the root folder excluded).
+        latency (float): Seconds of latency of the stub package index.
+        error_rate (float): Fraction of the stub index requests answered with a 500 error.
+        repeat (int): Number of runs of the scan benchmarks.
+        classify_repeat (int): Number of runs of the classifier benchmark (it is dominated by the latency).
+
+    Returns:
+        dict: The benchmark report, ready to be saved as JSON.
+    """
+    from pyprojectsetup.hlp_package import analyze_py_files, categorize_packages, find_files, get_unique_packages_from_filepath
+    from pyprojectsetup.hlp_scan_store import scan_files
+
+    version, commit = get_version()
+    report = {'version': version, 'commit': commit, 'python': platform.python_version(),
+              'platform': platform.platform(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'index': {'latency': latency, 'error_rate': error_rate}, 'results': {}}
+
+    with tempfile.TemporaryDirectory() as root:
+        project = generate_project(root, **project_params)
+        report['project'] = {key: value for key, value in project.items() if key != 'third_party'}
+        results = report['results']
+
+        results['find_files'], file_paths = measure(lambda: find_files(root, '*.py', excluded_folders=['venv']), repeat)
+        results['analyze_py_files'], _ = measure(lambda: analyze_py_files(file_paths), repeat)
+        results['scan_files'], store = measure(lambda: scan_files(file_paths), repeat)
+        results['scan_files'].update(imports=len(store.imports), distinct_names=len(store.modules))
+        with contextlib.redirect_stdout(io.StringIO()):
+            results['get_unique_packages_from_filepath'], packages = measure(
+                lambda: get_unique_packages_from_filepath(root, excluded_folders=['venv']), repeat)
+
+        # half of the third party packages are known to the index, the others end up undetermined
+        with StubIndex(project['third_party'][::2], latency=latency, error_rate=error_rate) as index:
+            results['categorize_packages'], categories = measure(
+                lambda: categorize_packages(packages, filepath=root, index_url=index.url), classify_repeat)
+            results['categorize_packages'].update(requests=index.requests, errors=index.errors,
+                                                  pypi=len(categories[0]), undetermined=len(categories[2]))
+    return report
+
+
+def compare_reports(new, old, threshold=0.1):
+    """
+    Compare the median timings of two reports.
+
+    Returns:
+        list of dict: One entry per benchmark present in both reports with the keys 'benchmark', 'old', 'new',
+            'ratio' (new / old) and 'regression' (True when the ratio is above 1 + threshold).
+    """
+    comparison = []
+    for name, result in new['results'].items():
+        if name in old.get('results', {}):
+            ratio = result['median'] / old['results'][name]['median']
+            comparison.append({'benchmark': name, 'old': old['results'][name]['median'], 'new': result['median'],
+                               'ratio': ratio, 'regression': ratio > 1 + threshold})
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pyprojectsetup scanner and classifier.")
+    parser.add_argument('--files', type=int, default=500, help="python files of the synthetic project")
+    parser.add_argument('--depth', type=int, default=3, help="depth of the folder tree")
+    parser.add_argument('--branching', type=int, default=3, help="sub folders per folder")
+    parser.add_argument('--lines', type=int, default=100, help="code lines per file (file size)")
+    parser.add_argument('--imports', type=int, default=10, help="import statements per file (import density)")
+    parser.add_argument('--packages', type=int, default=40, help="distinct third party packages")
+    parser.add_argument('--decoy-files', type=int, default=500, help="python files in the decoy venv/ folder")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the project generator")
+    parser.add_argument('--latency', type=float, default=0.05, help="latency of the stub index (seconds)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of stub index requests failing")
+    parser.add_argument('--repeat', type=int, default=5, help="runs of each scan benchmark")
+    parser.add_argument('--output', help="write the JSON report to this file")
+    parser.add_argument('--compare', help="JSON report of a previous run to compare with")
+    parser.add_argument('--threshold', type=float, default=0.1, help="slowdown reported as a regression (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    project_params = {'files': args.files, 'depth': args.depth, 'branching': args.branching, 'lines': args.lines,
+                      'imports': args.imports, 'packages': args.packages, 'decoy_files': args.decoy_files, 'seed': args.seed}
+    report = run_benchmarks(project_params, latency=args.latency, error_rate=args.error_rate, repeat=args.repeat)
+
+    for name, result in report['results'].items():
+        print(f"{name:36} median {result['median'] * 1000:10.2f} ms   min {result['min'] * 1000:10.2f} ms")
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            comparison = compare_reports(report, json.load(file), threshold=args.threshold)
+        for entry in comparison:
+            flag = '  REGRESSION' if entry['regression'] else ''
+            print(f"{entry['benchmark']:36} x{entry['ratio']:6.2f}{flag}")
+        return 1 if any(entry['regression'] for entry in comparison) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
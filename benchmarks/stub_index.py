@@ -0,0 +1,84 @@
+"""A local stand-in for the PyPI JSON API with configurable latency and error rate."""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubIndex:
+    """
+    Serve `/pypi/<name>/json` on localhost: 200 for the known packages, 404 for the others.
+
+    Args:
+        known_packages (iterable of str): Packages the index answers 200 for.
+        latency (float): Seconds every response is delayed by.
+        error_rate (float): Fraction of the requests answered with a 500 error.
+        seed (int): Seed of the random generator picking the failing requests.
+
+    Use it as a context manager, `url` is then the index_url to give to `categorize_packages`.
+    """
+
+    def __init__(self, known_packages, latency=0.0, error_rate=0.0, seed=0):
+        self.known_packages = set(known_packages)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/pypi/{{}}/json"
+
+    def _respond(self, path):
+        """Return the status code of a request, counting it."""
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.error_rate
+            self.errors += failed
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            return 500
+        parts = path.strip('/').split('/')
+        if len(parts) == 3 and parts[0] == 'pypi' and parts[2] == 'json' and parts[1] in self.known_packages:
+            return 200
+        return 404
+
+    def start(self):
+        index = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status = index._respond(self.path)
+                body = json.dumps({'info': {'name': self.path.split('/')[2]}} if status == 200 else {}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,93 @@
+"""Generate synthetic python projects of configurable size to benchmark the scanner."""
+import os
+import random
+
+STDLIB_MODULES = ['os', 'sys', 're', 'json', 'math', 'collections', 'itertools', 'functools', 'subprocess', 'shutil']
+
+
+def third_party_names(count):
+    """Return the names of the fake third party packages imported by the synthetic projects."""
+    return [f"thirdparty{index}" for index in range(count)]
+
+
+def _import_line(rng, packages):
+    package = rng.choice(packages)
+    style = rng.randrange(3)
+    if style == 0:
+        return f"import {package}"
+    if style == 1:
+        return f"import {package}.sub{rng.randrange(5)} as alias{rng.randrange(100)}"
+    return f"from {package}.sub{rng.randrange(5)} import name{rng.randrange(100)}"
+
+
+def _module_source(rng, packages, imports, lines):
+    """Return the source of one module: `imports` import statements followed by about `lines` lines of code."""
+    source = [_import_line(rng, packages) for _ in range(imports)]
+    function_index = 0
+    while len(source) < imports + lines:
+        source.extend([
+            "",
+            f"def function_{function_index}(value, factor={rng.randrange(10)}):",
+            f"    \"\"\"Docstring of function {function_index}.\"\"\"",
+            "    result = [item * factor for item in range(value) if item % 3]",
+            "    return {'total': sum(result), 'count': len(result)}",
+        ])
+        function_index += 1
+    return "\n".join(source) + "\n"
+
+
+def _folders(root, depth, branching):
+    """Return the folders of a tree of the given depth, each folder having `branching` sub folders."""
+    folders = [root]
+    level = [root]
+    for current_depth in range(depth):
+        level = [os.path.join(folder, f"pkg{current_depth}_{index}") for folder in level for index in range(branching)]
+        folders.extend(level)
+    return folders
+
+
+def generate_project(root, files=100, depth=2, branching=3, lines=50, imports=8, packages=30, decoy_files=100, seed=0):
+    """
+    Write a synthetic project.
+
+    Args:
+        root (str): Folder where the project is written (created if needed).
+        files (int): Number of python files of the project.
+        depth (int): Depth of the folder tree holding the files.
+        branching (int): Number of sub folders of every folder of the tree.
+        lines (int): Approximate number of code lines of every file, on top of the imports.
+        imports (int): Import statements of every file (import density).
+        packages (int): Number of distinct third party packages the files import from.
+        decoy_files (int): Python files written under `venv/` (a fake installed environment the scan must skip).
+        seed (int): Seed of the random generator, the same parameters always give the same project.
+
+    Returns:
+        dict: The parameters, plus 'bytes' (total size of the project files) and 'third_party' (sorted third
+            party packages actually imported by the project files).
+    """
+    rng = random.Random(seed)
+    names = third_party_names(packages)
+    pool = names + STDLIB_MODULES
+    folders = _folders(root, depth, branching)
+    used, total_bytes = set(), 0
+
+    for index in range(files):
+        folder = folders[index % len(folders)]
+        os.makedirs(folder, exist_ok=True)
+        source = _module_source(rng, pool, imports, lines)
+        used.update(line.split()[1].split('.')[0] for line in source.splitlines()[:imports])
+        with open(os.path.join(folder, f"module_{index}.py"), "w") as file:
+            file.write(source)
+        total_bytes += len(source)
+
+    decoy_root = os.path.join(root, "venv", "lib", "python3", "site-packages")
+    decoy_pool = [f"decoy{index}" for index in range(max(1, packages // 2))]
+    for index in range(decoy_files):
+        folder = os.path.join(decoy_root, decoy_pool[index % len(decoy_pool)])
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"decoy_{index}.py"), "w") as file:
+            file.write(_module_source(rng, decoy_pool, imports, lines))
+
+    return {'files': files, 'depth': depth, 'branching': branching, 'lines': lines, 'imports': imports,
+            'packages': packages, 'decoy_files': decoy_files, 'seed': seed, 'bytes': total_bytes,
+            'third_party': sorted(used & set(names))}
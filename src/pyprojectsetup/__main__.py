@@ -0,0 +1,5 @@
+import sys
+
+from pyprojectsetup.cli import main
+
+sys.exit(main())
@@ -0,0 +1,316 @@
+"""
+Command line interface of pyprojectsetup.
+
+Only what is needed to parse the command line is imported at module level, every command imports the helpers it
+uses when it runs, so that `pyprojectsetup scan` starts fast enough to be called from pre-commit hooks.
+"""
+import argparse
+import contextlib
+import json
+import sys
+
+from pyprojectsetup.hpl_venv_matrix import add_matrix_arguments
+
+DEFAULT_EXCLUDED_FOLDERS = ['venv', '.ipynb_checkpoints']  # as in hlp_package, not imported at startup
+
+
+def _scan_packages(args):
+    """Return the root packages imported by the project and the distributions installed by its notebook pip magics."""
+    from pyprojectsetup.hlp_package import get_unique_packages_from_filepath, normalize_package_name
+
+    pip_packages = []
+    packages = get_unique_packages_from_filepath(args.path, flag_exclude=not args.no_exclude,
+                                                 additional_exclude_packages=args.exclude_package,
+                                                 excluded_folders=args.exclude_folder or DEFAULT_EXCLUDED_FOLDERS,
+                                                 flag_verbose=args.verbose, pip_packages=pip_packages)
+    unique_pip_packages = {}
+    for package in pip_packages:
+        unique_pip_packages.setdefault(normalize_package_name(package), package)
+    return packages, sorted(unique_pip_packages.values())
+
+
+def _scan(args):
+    packages, pip_packages = _scan_packages(args)
+    return {'packages': packages, 'pip_installed': pip_packages}, 0
+
+
+def _classify(args):
+    from pyprojectsetup.hlp_package import categorize_packages
+
+    packages, pip_packages = _scan_packages(args)
+    pypi_packages, localpy_packages, undetermined_packages = categorize_packages(packages, filepath=args.path)
+    return {'pypi': sorted(pypi_packages),
+            'local': sorted(localpy_packages),
+            'undetermined': sorted(undetermined_packages),
+            'pip_installed': pip_packages}, 0
+
+
+def _sync(args):
+    from pyprojectsetup.hlp_package import update_requirements_txt
+
+    categories, _ = _classify(args)
+    # the notebook pip installs are distribution names, they are requirements as they are
+    missing = update_requirements_txt(categories['pypi'] + categories['pip_installed'], args.requirements,
+                                      flag_confirm=not args.yes)
+    if missing is None:
+        return dict(categories, missing=[], error=f"Could not update {args.requirements}"), 1
+    return dict(categories, missing=missing), 0
+
+
+def _install(args):
+    from pyprojectsetup.hpl_pip_install import install_requirements, install_requirements_onepackage_at_a_time
+
+    if args.one_at_a_time:
+        installs = install_requirements_onepackage_at_a_time(args.requirements)
+        if installs is None:
+            return {'requirements': args.requirements, 'error': f"Could not read {args.requirements}"}, 1
+        installed, failed = installs
+        return {'requirements': args.requirements, 'installed': installed, 'failed': failed}, 1 if failed else 0
+    if not install_requirements(args.requirements):
+        return {'requirements': args.requirements, 'error': "pip install failed"}, 1
+    return {'requirements': args.requirements}, 0
+
+
+def _venv(args):
+    from pyprojectsetup.hpl_venv_matrix import run_matrix
+
+    try:
+        results = run_matrix(args)
+    except ValueError as e:
+        return {'error': str(e)}, 1
+    return results, 0 if all(result['error'] is None for result in results) else 1
+
+
+def _importtime(args):
+    from pyprojectsetup.hlp_importtime import report_heaviest_imports
+
+    report = report_heaviest_imports(args.path, python_executable=args.python, top=args.top,
+                                     excluded_folders=args.exclude_folder or DEFAULT_EXCLUDED_FOLDERS,
+                                     additional_exclude_packages=args.exclude_package, max_workers=args.jobs)
+    return report, 0
+
+
+def _print_importtime(report):
+    for profile in report:
+        status = f"  [{profile['error']}]" if profile['error'] else ''
+        if profile['preloaded']:
+            status += "  [imported at interpreter startup, time unknown]"
+        print(f"{profile['cumulative_ms']:9.1f} ms {profile['self_ms']:9.1f} ms  {profile['package']}{status}")
+        for importer in profile['importers']:
+            print(f"{'':24}{importer}")
+
+
+def _footprint(args):
+    from pyprojectsetup.hlp_footprint import footprint_report
+
+    try:
+        return footprint_report(args.requirements, venv_path=args.venv), 0
+    except OSError as e:  # missing requirements file, or a folder that is not a virtual environment
+        return {'requirements': args.requirements, 'error': f"Could not read {e.filename or args.requirements}"}, 1
+
+
+def _print_footprint(report):
+    for entry in report:
+        missing = f"  [not installed: {', '.join(entry['missing'])}]" if entry['missing'] else ''
+        print(f"{entry['attributed_bytes'] / 1e6:9.2f} MB {entry['files']:7d} files  {entry['requirement']}"
+              f" ({len(entry['closure'])} distributions){missing}")
+
+
+def _unused(args):
+    from pyprojectsetup.hlp_unused import find_unused_requirements, prune_requirements_txt
+
+    packages, _ = _scan_packages(args)
+    try:
+        used, unused, allowed, unresolved = find_unused_requirements(args.requirements, packages, allow_list=args.allow,
+                                                                     venv_path=args.venv)
+    except OSError as e:
+        return {'requirements': args.requirements, 'error': f"Could not read {e.filename or args.requirements}"}, 1
+    result = {'used': used, 'unused': unused, 'allowed': allowed, 'unresolved': unresolved}  # unresolved: never pruned
+    if args.prune or args.output:
+        result['removed'] = prune_requirements_txt(args.requirements, unused, output_path=args.output)
+    return result, 0
+
+
+def _watch(args):
+    from pyprojectsetup.hlp_watch import watch_requirements
+
+    on_update = None
+    if args.json:  # one JSON line per update on the real stdout, the final result follows when watching stops
+        on_update = lambda update: print(json.dumps(update), file=sys.__stdout__, flush=True)
+    packages = watch_requirements(args.path, requirements_path=args.requirements, flag_apply=args.apply,
+                                  excluded_folders=args.exclude_folder or DEFAULT_EXCLUDED_FOLDERS,
+                                  additional_exclude_packages=args.exclude_package, debounce=args.debounce,
+                                  flag_polling=args.polling, interval=args.interval, on_update=on_update)
+    return packages, 0
+
+
+def _groups(args):
+    from pyprojectsetup.hlp_import_context import (DEFAULT_TEST_FOLDERS, get_requirement_groups_from_filepath,
+                                                   write_requirement_groups)
+
+    groups = get_requirement_groups_from_filepath(args.path, flag_exclude=not args.no_exclude,
+                                                  additional_exclude_packages=args.exclude_package,
+                                                  excluded_folders=args.exclude_folder or DEFAULT_EXCLUDED_FOLDERS,
+                                                  test_folders=args.test_folder or DEFAULT_TEST_FOLDERS,
+                                                  flag_verbose=args.verbose)
+    if args.write:
+        added = write_requirement_groups(groups, output_dir=args.output_dir or args.path, filepath=args.path)
+        return {'groups': groups, 'added': added}, 0
+    return groups, 0
+
+
+def _history(args):
+    import subprocess
+    from pyprojectsetup.hlp_git_history import list_tags, scan_revisions
+
+    try:
+        revisions = list(args.revision or [])
+        if args.tags or not revisions:
+            revisions = list_tags(args.path, pattern=args.tags) + revisions
+        if not args.revision:
+            revisions.append('HEAD')
+        history = scan_revisions(args.path, revisions, flag_exclude=not args.no_exclude,
+                                 additional_exclude_packages=args.exclude_package,
+                                 excluded_folders=args.exclude_folder or DEFAULT_EXCLUDED_FOLDERS)
+    except (subprocess.CalledProcessError, OSError, RuntimeError, ValueError) as e:  # not a repository, unknown revision
+        return {'error': str(e)}, 1
+    return history, 0
+
+
+def _print_history(history):
+    for entry in history:
+        changes = [f"+{package}" for package in entry['added']] + [f"-{package}" for package in entry['removed']]
+        print(f"{entry['revision']:24} {entry['commit'][:12]}  {len(entry['packages']):4d} packages  {' '.join(changes)}")
+
+
+def _add_scan_arguments(parser):
+    parser.add_argument('path', nargs='?', default='.', help="project folder to scan (default: current folder)")
+    parser.add_argument('--exclude-folder', action='append', metavar='NAME',
+                        help="skip files whose path contains NAME, can be repeated (default: venv, .ipynb_checkpoints)")
+    parser.add_argument('--exclude-package', action='append', metavar='NAME', help="package to leave out, can be repeated")
+    parser.add_argument('--no-exclude', action='store_true', help="keep the known standard library packages")
+
+
+def build_parser():
+    """Return the argparse parser of the `pyprojectsetup` command."""
+    parser = argparse.ArgumentParser(prog='pyprojectsetup', description="Set up and maintain the dependencies of a python project.")
+    parser.add_argument('--json', action='store_true', help="print a machine readable JSON result on stdout")
+    parser.add_argument('-v', '--verbose', action='store_true', help="print the imports of every file and info logs")
+    parser.add_argument('--trace', metavar='FILE', help="write a Chrome trace (chrome://tracing, ui.perfetto.dev) of the run")
+    parser.add_argument('--trace-summary', action='store_true', help="print the time spent per phase on stderr")
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    scan = subparsers.add_parser('scan', help="list the root packages imported by a project")
+    _add_scan_arguments(scan)
+    scan.set_defaults(handler=_scan)
+
+    classify = subparsers.add_parser('classify', help="sort the imported packages into PyPI, local and undetermined")
+    _add_scan_arguments(classify)
+    classify.set_defaults(handler=_classify)
+
+    sync = subparsers.add_parser('sync', help="add the PyPI packages imported by a project to its requirements.txt")
+    _add_scan_arguments(sync)
+    sync.add_argument('--requirements', default='requirements.txt', help="requirements file to update")
+    sync.add_argument('-y', '--yes', action='store_true', help="add the missing packages without asking")
+    sync.set_defaults(handler=_sync)
+
+    install = subparsers.add_parser('install', help="install the packages of a requirements file")
+    install.add_argument('requirements', nargs='?', default='requirements.txt', help="requirements file to install")
+    install.add_argument('--one-at-a-time', action='store_true', help="install the packages one by one")
+    install.set_defaults(handler=_install)
+
+    importtime = subparsers.add_parser('importtime', help="rank the imported packages by import time (cumulative, self)")
+    _add_scan_arguments(importtime)
+    importtime.add_argument('--python', default=sys.executable, help="interpreter or virtual environment to profile with")
+    importtime.add_argument('--top', type=int, default=10, help="number of packages reported (0 for all)")
+    importtime.add_argument('--jobs', type=int, default=4, help="number of interpreters run in parallel")
+    importtime.set_defaults(handler=_importtime, printer=_print_importtime)
+
+    footprint = subparsers.add_parser('footprint', help="rank the requirements by the installed size of their dependencies")
+    footprint.add_argument('requirements', nargs='?', default='requirements.txt', help="requirements file to measure")
+    footprint.add_argument('--venv', help="virtual environment to measure (default: the current environment)")
+    footprint.set_defaults(handler=_footprint, printer=_print_footprint)
+
+    unused = subparsers.add_parser('unused', help="list the requirements the project never imports")
+    _add_scan_arguments(unused)
+    unused.add_argument('--requirements', default='requirements.txt', help="requirements file to check")
+    unused.add_argument('--allow', action='append', metavar='NAME', help="requirement used without import (plugin, tool), can be repeated")
+    unused.add_argument('--venv', help="virtual environment mapping distributions to import names (default: the current environment)")
+    unused.add_argument('--prune', action='store_true', help="remove the unused requirements from the requirements file")
+    unused.add_argument('--output', metavar='FILE', help="write the pruned requirements to FILE instead")
+    unused.set_defaults(handler=_unused)
+
+    watch = subparsers.add_parser('watch', help="keep the imported packages and requirements.txt in sync while editing")
+    _add_scan_arguments(watch)
+    watch.add_argument('--requirements', default='requirements.txt', help="requirements file to keep in sync")
+    watch.add_argument('--apply', action='store_true', help="add new PyPI packages to the requirements file without asking")
+    watch.add_argument('--debounce', type=float, default=0.5, help="seconds without change before a batch is processed")
+    watch.add_argument('--polling', action='store_true', help="use stat polling even where inotify is available")
+    watch.add_argument('--interval', type=float, default=1.0, help="seconds between two walks when polling")
+    watch.set_defaults(handler=_watch)
+
+    groups = subparsers.add_parser('groups', help="split the imported packages into core, optional and dev requirements")
+    _add_scan_arguments(groups)
+    groups.add_argument('--test-folder', action='append', metavar='NAME',
+                        help="folder name holding test code, can be repeated (default: tests, test, testing)")
+    groups.add_argument('--write', action='store_true',
+                        help="add the PyPI packages to requirements.txt, requirements-optional.txt and requirements-dev.txt")
+    groups.add_argument('--output-dir', help="folder of the requirements files (default: the scanned folder)")
+    groups.set_defaults(handler=_groups)
+
+    history = subparsers.add_parser('history', help="packages imported at past git revisions, read without checkout")
+    _add_scan_arguments(history)
+    history.add_argument('--revision', action='append', metavar='REV', help="commit, tag or branch to scan, can be repeated (default: all the tags, then HEAD)")
+    history.add_argument('--tags', metavar='PATTERN', help="scan the tags matching PATTERN, oldest first (ex : 'v*')")
+    history.set_defaults(handler=_history, printer=_print_history)
+
+    venv = subparsers.add_parser('venv', help="create a matrix of virtual environments without any prompt")
+    add_matrix_arguments(venv)
+    venv.set_defaults(handler=_venv)
+    return parser
+
+
+def _print_result(result):
+    """Print a command result in a human readable form."""
+    if isinstance(result, dict):
+        for key, value in result.items():
+            print(f"{key}: {', '.join(value) if isinstance(value, list) else value}")
+    elif isinstance(result, list):
+        for item in result:
+            print(json.dumps(item) if isinstance(item, dict) else item)
+
+
+def main(argv=None):
+    """Entry point of the `pyprojectsetup` command, returns the exit code."""
+    args = build_parser().parse_args(argv)
+    if args.verbose:  # warnings and errors reach stderr through the logging last resort handler otherwise
+        import logging
+        logging.basicConfig(level=logging.INFO, stream=sys.stderr, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.trace or args.trace_summary:
+        from pyprojectsetup import hlp_trace
+
+        sinks = [hlp_trace.ChromeTraceSink(args.trace)] if args.trace else []
+        if args.trace_summary:
+            sinks.append(hlp_trace.SummarySink(sys.stderr))
+        hlp_trace.enable(sinks)
+    try:
+        if args.json:
+            with contextlib.redirect_stdout(sys.stderr):  # keep stdout for the JSON result
+                result, exit_code = args.handler(args)
+            print(json.dumps(result, indent=2))
+        else:
+            result, exit_code = args.handler(args)
+            if isinstance(result, dict) and 'error' in result:  # the printers of the commands expect a report
+                _print_result(result)
+            else:
+                getattr(args, 'printer', _print_result)(result)
+    finally:
+        if args.trace or args.trace_summary:
+            hlp_trace.disable()
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
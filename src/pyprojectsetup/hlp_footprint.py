@@ -0,0 +1,153 @@
+import os
+import re
+import sys
+
+try:
+    from importlib import metadata
+except ImportError:  # python 3.7
+    import importlib_metadata as metadata
+
+from pyprojectsetup.hlp_package import normalize_package_name, read_requirements
+from pyprojectsetup.hpl_venv_install import get_venv_site_packages, get_venv_version
+
+try:  # packaging evaluates the environment markers of the dependencies, without it only the extras are filtered out
+    from packaging.requirements import InvalidRequirement, Requirement
+except ImportError:
+    Requirement = None
+
+
+def load_distributions(venv_path=None):
+    """
+    Return the distributions installed in a virtual environment, read offline from their metadata.
+
+    Args:
+        venv_path (str, optional): Folder of the virtual environment. Defaults to None (the current environment).
+
+    Returns:
+        dict: normalized distribution name -> importlib.metadata.Distribution
+    """
+    path = sys.path if venv_path is None else [get_venv_site_packages(venv_path, get_venv_version(venv_path))]
+    distributions = {}
+    for dist in metadata.distributions(path=path):
+        name = dist.metadata['Name']
+        if name:
+            distributions.setdefault(normalize_package_name(name), dist)  # first one wins, as on sys.path
+    return distributions
+
+
+def get_dependencies(dist):
+    """
+    Return the normalized names of the runtime dependencies of a distribution (extras are not followed).
+
+    A malformed Requires-Dist entry is skipped, the other dependencies are still returned.
+    """
+    dependencies = []
+    for requirement in dist.requires or []:
+        if Requirement is not None:
+            try:
+                parsed = Requirement(requirement)
+            except InvalidRequirement:
+                continue
+            if parsed.marker is not None and not parsed.marker.evaluate({'extra': ''}):
+                continue
+            dependencies.append(normalize_package_name(parsed.name))
+        elif 'extra' not in requirement.partition(';')[2]:
+            match = re.match(r"[A-Za-z0-9._-]+", requirement.strip())
+            if match:
+                dependencies.append(normalize_package_name(match.group(0)))
+    return dependencies
+
+
+def get_distribution_size(dist):
+    """
+    Return the number of files and bytes of an installed distribution, from its RECORD file.
+
+    The sizes written in RECORD are used, files recorded without a size (the RECORD itself, .pyc files) are
+    measured on disk when they exist.
+
+    Returns:
+        tuple: (file count, bytes)
+    """
+    files = dist.files or []
+    total = 0
+    for file in files:
+        if file.size is not None:
+            total += file.size
+        else:
+            try:
+                total += os.path.getsize(file.locate())
+            except OSError:
+                pass
+    return len(files), total
+
+
+def get_closure(name, distributions):
+    """
+    Return the dependency closure of a distribution (itself included).
+
+    Returns:
+        tuple: (set of the installed normalized names of the closure, sorted list of the missing names)
+    """
+    closure, missing = set(), set()
+    to_visit = [normalize_package_name(name)]
+    while to_visit:
+        current = to_visit.pop()
+        if current in closure or current in missing:
+            continue
+        if current not in distributions:
+            missing.add(current)
+            continue
+        closure.add(current)
+        to_visit.extend(get_dependencies(distributions[current]))
+    return closure, sorted(missing)
+
+
+def footprint_report(requirements, venv_path=None):
+    """
+    Attribute the installed size of an environment to its top level requirements.
+
+    Each requirement is charged for its own dependency closure. A distribution needed by several requirements is
+    split evenly between them, so that the attributed bytes of all requirements add up to the installed size of
+    their union.
+
+    Args:
+        requirements (str or list of str): A requirements.txt path, or a list of distribution names (for example
+            the PyPI packages returned by `categorize_packages`).
+        venv_path (str, optional): Folder of the virtual environment to measure. Defaults to None (the current environment).
+
+    Returns:
+        list of dict: One entry per requirement, most expensive first, with the keys 'requirement', 'files',
+            'bytes' (whole closure), 'exclusive_bytes' (distributions no other requirement needs),
+            'attributed_bytes', 'closure' and 'missing' (names not installed).
+    """
+    if isinstance(requirements, str):
+        requirements = read_requirements(requirements)
+    requirements = list(dict.fromkeys(requirements))
+    distributions = load_distributions(venv_path)
+
+    closures = {requirement: get_closure(requirement, distributions) for requirement in requirements}
+    owners = {}
+    for requirement, (closure, _) in closures.items():
+        for name in closure:
+            owners.setdefault(name, []).append(requirement)
+    sizes = {name: get_distribution_size(distributions[name]) for name in owners}
+
+    report = []
+    for requirement, (closure, missing) in closures.items():
+        entry = {'requirement': requirement, 'files': 0, 'bytes': 0, 'exclusive_bytes': 0, 'attributed_bytes': 0.0,
+                 'closure': sorted(closure), 'missing': missing}
+        for name in closure:
+            file_count, size = sizes[name]
+            entry['files'] += file_count
+            entry['bytes'] += size
+            entry['attributed_bytes'] += size / len(owners[name])
+            if len(owners[name]) == 1:
+                entry['exclusive_bytes'] += size
+        report.append(entry)
+    report.sort(key=lambda entry: entry['attributed_bytes'], reverse=True)
+    return report
+
+
+if __name__ == '__main__':
+    for entry in footprint_report('./requirements.txt'):
+        print(f"{entry['attributed_bytes'] / 1e6:9.2f} MB  {entry['requirement']}  ({len(entry['closure'])} distributions)")
@@ -0,0 +1,216 @@
+"""
+Third party packages imported by a project at past git revisions, read from the object store without any checkout.
+
+All the objects (commits, trees, blobs) are read through one long-lived `git cat-file --batch` process. The root
+packages of every blob are kept by blob SHA and those of every folder by tree SHA, so a file or a folder that did not
+change between two revisions is never read or parsed again: scanning many releases costs about the scan of the
+first one plus the files changed since.
+"""
+import subprocess
+
+from pyprojectsetup import hlp_trace
+from pyprojectsetup.hlp_package import (DEFAULT_EXCLUDE_PACKAGES, DEFAULT_EXCLUDED_FOLDERS, extract_imports,
+                                        is_excluded_path)
+
+TREE_MODE = b'40000'
+BLOB_MODES = (b'100644', b'100755')  # symbolic links (120000) and submodules (160000) are not scanned
+
+
+class GitObjectReader:
+    """
+    Read git objects through a single `git cat-file --batch` process.
+
+    Args:
+        repo (str): A folder of the git repository.
+    """
+
+    def __init__(self, repo):
+        self.repo = repo
+        self.process = subprocess.Popen(['git', '-C', repo, 'cat-file', '--batch'],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def read(self, name):
+        """
+        Return (sha, type, content) of an object.
+
+        Args:
+            name (str): Any object name git understands: a SHA, a tag, 'HEAD~3', 'v1.0^{tree}'...
+
+        Raises:
+            ValueError: If the object does not exist or the name is ambiguous.
+        """
+        if '\n' in name:
+            raise ValueError(f"Invalid git object name: {name!r}")
+        self.process.stdin.write(name.encode() + b'\n')
+        self.process.stdin.flush()
+        header = self.process.stdout.readline()
+        if not header:
+            raise RuntimeError(f"git cat-file stopped in {self.repo}")
+        fields = header.split()
+        if len(fields) != 3:  # '<name> missing' or '<name> ambiguous'
+            raise ValueError(f"Unknown git object in {self.repo}: {name}")
+        content = self.process.stdout.read(int(fields[2]))
+        self.process.stdout.read(1)  # newline after the content
+        return fields[0].decode(), fields[1].decode(), content
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+def parse_tree(content, sha_size=20):
+    """
+    Return the (mode, name, sha) entries of a raw tree object.
+
+    Args:
+        content (bytes): The tree as returned by `git cat-file`.
+        sha_size (int, optional): Size of a binary object id, 20 for SHA-1 and 32 for SHA-256 repositories.
+    """
+    entries = []
+    pos = 0
+    while pos < len(content):
+        space = content.index(b' ', pos)
+        nul = content.index(b'\0', space)
+        sha_end = nul + 1 + sha_size
+        entries.append((content[pos:space], content[space + 1:nul].decode('utf-8', 'surrogateescape'),
+                        content[nul + 1:sha_end].hex()))
+        pos = sha_end
+    return entries
+
+
+def list_tags(repo, pattern=None):
+    """Return the tags of a repository, oldest first, optionally filtered by a glob pattern (ex : 'v*')."""
+    command = ['git', '-C', repo, 'tag', '--list', '--sort=creatordate'] + ([pattern] if pattern else [])
+    with hlp_trace.span('subprocess', 'git', command=' '.join(command)):
+        completed = subprocess.run(command, capture_output=True, text=True, check=True)
+    return completed.stdout.split()
+
+
+class RevisionScanner:
+    """
+    Root packages imported by the `.py` files of a repository at any revision, with results shared across revisions.
+
+    Args:
+        repo (str): A folder of the git repository.
+        flag_exclude (bool, optional): Leave DEFAULT_EXCLUDE_PACKAGES out of the results. Defaults to True.
+        additional_exclude_packages (list of str, optional): Packages left out on top of DEFAULT_EXCLUDE_PACKAGES.
+        excluded_folders (list of str, optional): Folders skipped, with the `find_files` rule applied to the paths
+            relative to the repository root. Defaults to DEFAULT_EXCLUDED_FOLDERS.
+    """
+
+    def __init__(self, repo, flag_exclude=True, additional_exclude_packages=None, excluded_folders=DEFAULT_EXCLUDED_FOLDERS):
+        self.repo = repo
+        self.excluded_folders = list(excluded_folders)
+        self.exclude_packages = set(DEFAULT_EXCLUDE_PACKAGES + (additional_exclude_packages or [])) if flag_exclude else set()
+        self.blob_roots = {}  # blob sha -> frozenset of the root packages imported by the file
+        self.tree_roots = {}  # (tree sha, path) -> frozenset of the root packages imported under the folder
+        self._reader = None
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            self._reader = GitObjectReader(self.repo)
+        return self._reader
+
+    def _blob(self, sha, path):
+        roots = self.blob_roots.get(sha)
+        if roots is not None:
+            hlp_trace.count('blob_cache_hits')
+            return roots
+        _, _, content = self.reader.read(sha)
+        hlp_trace.count('files_scanned')
+        hlp_trace.count('bytes_read', len(content))
+        with hlp_trace.span('parse', file=path, blob=sha):
+            try:
+                roots = frozenset(module.split('.')[0] for module in extract_imports(content))
+            except (SyntaxError, ValueError):  # invalid python or null bytes, as in a broken commit
+                roots = frozenset()
+        self.blob_roots[sha] = roots
+        return roots
+
+    def _tree(self, sha, path):
+        # the path is part of the key because the excluded folders are matched against it
+        roots = self.tree_roots.get((sha, path))
+        if roots is not None:
+            hlp_trace.count('tree_cache_hits')
+            return roots
+        _, _, content = self.reader.read(sha)
+        roots = set()
+        for mode, name, entry_sha in parse_tree(content, len(sha) // 2):
+            entry_path = f"{path}/{name}" if path else name
+            if is_excluded_path(entry_path, self.excluded_folders):
+                continue
+            if mode == TREE_MODE:
+                roots |= self._tree(entry_sha, entry_path)
+            elif mode in BLOB_MODES and name.endswith('.py'):
+                roots |= self._blob(entry_sha, entry_path)
+        roots = frozenset(roots)
+        self.tree_roots[(sha, path)] = roots
+        return roots
+
+    def scan(self, revision):
+        """
+        Return (commit sha, sorted root packages) of one revision.
+
+        Raises:
+            ValueError: If the revision does not name a commit.
+        """
+        with hlp_trace.span('revision', 'git', revision=revision):
+            commit, _, content = self.reader.read(f"{revision}^{{commit}}")
+            tree = content.split(b'\n', 1)[0].split()[1].decode()  # first line of a commit: 'tree <sha>'
+            roots = self._tree(tree, '')
+        return commit, sorted(roots - self.exclude_packages)
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+def scan_revisions(repo, revisions, flag_exclude=True, additional_exclude_packages=None, excluded_folders=DEFAULT_EXCLUDED_FOLDERS):
+    """
+    Scan several revisions of a repository and compare each one with the previous one.
+
+    Args:
+        repo (str): A folder of the git repository.
+        revisions (list of str): Revisions to scan in order, ex : the output of `list_tags`.
+        flag_exclude (bool, optional): Leave DEFAULT_EXCLUDE_PACKAGES out of the results. Defaults to True.
+        additional_exclude_packages (list of str, optional): Packages left out on top of DEFAULT_EXCLUDE_PACKAGES.
+        excluded_folders (list of str, optional): Folders skipped, with the `find_files` rule. Defaults to DEFAULT_EXCLUDED_FOLDERS.
+
+    Returns:
+        list of dict: One dict per revision with the keys 'revision', 'commit', 'packages' and the packages
+            'added' and 'removed' since the previous revision (all the packages are 'added' for the first one).
+
+    Raises:
+        ValueError: If a revision does not name a commit.
+    """
+    history = []
+    previous = set()
+    with RevisionScanner(repo, flag_exclude=flag_exclude, additional_exclude_packages=additional_exclude_packages,
+                         excluded_folders=excluded_folders) as scanner:
+        for revision in revisions:
+            commit, packages = scanner.scan(revision)
+            history.append({'revision': revision, 'commit': commit, 'packages': packages,
+                            'added': sorted(set(packages) - previous), 'removed': sorted(previous - set(packages))})
+            previous = set(packages)
+    return history
+
+
+if __name__ == '__main__':
+    for entry in scan_revisions('../../', list_tags('../../') + ['HEAD']):
+        print(f"{entry['revision']:20} {entry['commit'][:10]}  +{entry['added']} -{entry['removed']}")
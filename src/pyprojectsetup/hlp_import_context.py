@@ -0,0 +1,236 @@
+"""
+Classify every import of a project by the context it runs in, and split the imported packages into requirement groups.
+
+An import is
+    - 'hard': executed when its module is imported, the package is needed at runtime,
+    - 'lazy': inside a function (or lambda), executed when the function is called, still a runtime requirement,
+    - 'optional': guarded by a `try` whose except clause names ImportError or ModuleNotFoundError, the code runs
+      without it,
+    - 'type_checking': inside `if TYPE_CHECKING:`, never executed at runtime,
+    - 'test': in a test file (test folder, test_*.py, *_test.py, conftest.py).
+
+A package goes to the strongest group among the contexts it is imported in, following CONTEXT_GROUPS: a package
+imported once as 'hard' is a core requirement even if the other files only import it behind a guard. 'lazy' imports
+are core requirements too, the context is only reported as detail.
+"""
+import ast
+import fnmatch
+import os
+
+from pyprojectsetup.hlp_package import (DEFAULT_EXCLUDE_PACKAGES, DEFAULT_EXCLUDED_FOLDERS, PYPI_URL,
+                                        categorize_packages, collect_imports, find_files, update_requirements_txt)
+
+CONTEXTS = ['hard', 'lazy', 'optional', 'type_checking', 'test']  # weakest last: an inner context wins if weaker
+CONTEXT_GROUPS = {'hard': 'core', 'lazy': 'core', 'optional': 'optional', 'type_checking': 'dev', 'test': 'dev'}
+GROUPS = ['core', 'optional', 'dev']  # strongest first
+REQUIREMENT_FILES = {'core': 'requirements.txt', 'optional': 'requirements-optional.txt', 'dev': 'requirements-dev.txt'}
+
+DEFAULT_TEST_FOLDERS = ['tests', 'test', 'testing']
+TEST_FILE_PATTERNS = ['test_*.py', '*_test.py', 'conftest.py']
+GUARD_EXCEPTIONS = {'ImportError', 'ModuleNotFoundError'}  # a broader except clause does not make an import optional
+
+_TRY_NODES = tuple(getattr(ast, name) for name in ('Try', 'TryStar') if hasattr(ast, name))
+
+
+def _weaker(context, other):
+    return other if CONTEXTS.index(other) > CONTEXTS.index(context) else context
+
+
+def _is_type_checking(test):
+    return (isinstance(test, ast.Name) and test.id == 'TYPE_CHECKING') or \
+           (isinstance(test, ast.Attribute) and test.attr == 'TYPE_CHECKING')
+
+
+def _guards_imports(handlers):
+    """Return True if one of the except clauses names ImportError or ModuleNotFoundError (a bare except does not)."""
+    for handler in handlers:
+        if handler.type is None:
+            continue
+        for exception in handler.type.elts if isinstance(handler.type, ast.Tuple) else [handler.type]:
+            name = exception.id if isinstance(exception, ast.Name) else getattr(exception, 'attr', None)
+            if name in GUARD_EXCEPTIONS:
+                return True
+    return False
+
+
+def _visit(node, context, imports):
+    if isinstance(node, ast.ImportFrom) and node.level:
+        return  # relative import: always a module of the project itself
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        imports.extend((module, context) for module in collect_imports(node))
+        return
+    if isinstance(node, ast.If) and _is_type_checking(node.test):
+        _visit_body(node.body, _weaker(context, 'type_checking'), imports)
+        _visit_body(node.orelse, context, imports)
+        return
+    if isinstance(node, _TRY_NODES) and _guards_imports(node.handlers):
+        guarded = _weaker(context, 'optional')
+        _visit_body(node.body, guarded, imports)
+        for handler in node.handlers:  # fallbacks, ex : `except ImportError: import json`
+            _visit_body(handler.body, guarded, imports)
+        _visit_body(node.orelse, guarded, imports)  # only run when the guarded imports succeeded
+        _visit_body(node.finalbody, context, imports)
+        return
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+        context = _weaker(context, 'lazy')
+    for child in ast.iter_child_nodes(node):
+        _visit(child, context, imports)
+
+
+def _visit_body(body, context, imports):
+    for node in body:
+        _visit(node, context, imports)
+
+
+def classify_imports(source, flag_test=False):
+    """
+    Return the imports of a python source with their context.
+
+    Args:
+        source (str or bytes): The python code.
+        flag_test (bool, optional): The code is a test file, all its imports are 'test'. Defaults to False.
+
+    Returns:
+        list of tuple: (module or "module.symbol" as in `collect_imports`, context) in source order, relative
+            imports left out.
+
+    Raises:
+        SyntaxError: If the source does not parse.
+    """
+    imports = []
+    _visit(ast.parse(source), 'test' if flag_test else 'hard', imports)
+    return imports
+
+
+def is_test_file(path, test_folders=DEFAULT_TEST_FOLDERS):
+    """Return True if a (project relative) path is a test file: in a test folder or named like one."""
+    parts = os.path.normpath(path).split(os.sep)
+    return any(part in test_folders for part in parts[:-1]) or \
+        any(fnmatch.fnmatch(parts[-1], pattern) for pattern in TEST_FILE_PATTERNS)
+
+
+def analyze_import_contexts(file_paths, root=None, test_folders=DEFAULT_TEST_FOLDERS):
+    """
+    Classify the imports of python files and notebooks.
+
+    Args:
+        file_paths (list of str): The .py / .ipynb files to analyze.
+        root (str, optional): Project folder the test folders are looked for in, so that a project stored under a
+            'test' folder is not all test code. Defaults to None (the paths are used as given).
+        test_folders (list of str, optional): Folder names holding test code. Defaults to DEFAULT_TEST_FOLDERS.
+
+    Returns:
+        dict: file path -> list of (module, context) as returned by `classify_imports`. Files that cannot be read
+            or parsed are left out, as are the notebook cells that do not parse.
+    """
+    results = {}
+    for file_path in file_paths:
+        flag_test = is_test_file(os.path.relpath(file_path, root) if root else file_path, test_folders)
+        try:
+            if file_path.endswith('.ipynb'):
+                from pyprojectsetup.hlp_notebook import cell_to_python, iter_code_cells
+
+                imports = []
+                for cell in iter_code_cells(file_path):
+                    python_source, _ = cell_to_python(cell)  # %pip installs are distribution names, not imports
+                    try:
+                        imports.extend(classify_imports(python_source, flag_test))
+                    except SyntaxError:
+                        continue
+            else:
+                with open(file_path, 'rb') as file:
+                    imports = classify_imports(file.read(), flag_test)
+        except (OSError, SyntaxError, ValueError):
+            continue
+        results[file_path] = imports
+    return results
+
+
+def get_package_contexts(results):
+    """Return root package -> sorted contexts it is imported in, from the output of `analyze_import_contexts`."""
+    package_contexts = {}
+    for imports in results.values():
+        for module, context in imports:
+            package_contexts.setdefault(module.split('.')[0], set()).add(context)
+    return {package: sorted(contexts, key=CONTEXTS.index) for package, contexts in sorted(package_contexts.items())}
+
+
+def group_packages(package_contexts, context_groups=CONTEXT_GROUPS):
+    """
+    Put every package in the strongest requirement group among its contexts.
+
+    Args:
+        package_contexts (dict): root package -> contexts, as returned by `get_package_contexts`.
+        context_groups (dict, optional): context -> group. Defaults to CONTEXT_GROUPS.
+
+    Returns:
+        dict: group ('core', 'optional', 'dev') -> sorted packages.
+    """
+    groups = {group: [] for group in GROUPS}
+    for package, contexts in sorted(package_contexts.items()):
+        groups[min((context_groups[context] for context in contexts), key=GROUPS.index)].append(package)
+    return groups
+
+
+def get_requirement_groups_from_filepath(filepath, flag_exclude=True, additional_exclude_packages=None,
+                                         excluded_folders=DEFAULT_EXCLUDED_FOLDERS, test_folders=DEFAULT_TEST_FOLDERS,
+                                         context_groups=CONTEXT_GROUPS, flag_verbose=False):
+    """
+    Scan a project and split the root packages it imports into requirement groups.
+
+    Args:
+        filepath (str): The project folder.
+        flag_exclude (bool, optional): Leave DEFAULT_EXCLUDE_PACKAGES out. Defaults to True.
+        additional_exclude_packages (list of str, optional): Packages left out on top of DEFAULT_EXCLUDE_PACKAGES.
+        excluded_folders (list of str, optional): Folders skipped, see `find_files`. Defaults to DEFAULT_EXCLUDED_FOLDERS.
+        test_folders (list of str, optional): Folder names holding test code. Defaults to DEFAULT_TEST_FOLDERS.
+        context_groups (dict, optional): context -> group. Defaults to CONTEXT_GROUPS.
+        flag_verbose (bool, optional): Print the contexts of every package. Defaults to False.
+
+    Returns:
+        dict: group ('core', 'optional', 'dev') -> sorted packages.
+    """
+    file_paths = find_files(filepath, ['*.py', '*.ipynb'], excluded_folders=excluded_folders)
+    package_contexts = get_package_contexts(analyze_import_contexts(file_paths, root=filepath, test_folders=test_folders))
+    if flag_exclude:
+        exclude_packages = set(DEFAULT_EXCLUDE_PACKAGES + (additional_exclude_packages or []))
+        package_contexts = {package: contexts for package, contexts in package_contexts.items()
+                            if package not in exclude_packages}
+
+    if flag_verbose:
+        for package, contexts in package_contexts.items():
+            print(f"{package}: {', '.join(contexts)}")
+
+    return group_packages(package_contexts, context_groups)
+
+
+def write_requirement_groups(groups, output_dir='.', filepath='.', index_url=PYPI_URL,
+                             requirement_files=REQUIREMENT_FILES):
+    """
+    Add the PyPI packages of every group to the requirements file of the group, without prompting.
+
+    Args:
+        groups (dict): group -> packages, as returned by `get_requirement_groups_from_filepath`.
+        output_dir (str, optional): Folder of the requirements files. Defaults to '.'.
+        filepath (str, optional): Project folder, its local modules are not written. Defaults to '.'.
+        index_url (str, optional): JSON API of the package index, see `check_pypi`. Defaults to PYPI_URL.
+        requirement_files (dict, optional): group -> file name. Defaults to REQUIREMENT_FILES.
+
+    Returns:
+        dict: group -> packages added to its requirements file.
+    """
+    pypi_packages, _, _ = categorize_packages([package for packages in groups.values() for package in packages],
+                                              filepath=filepath, index_url=index_url)
+    pypi_packages = set(pypi_packages)
+    added = {}
+    for group, packages in groups.items():
+        requirements_path = os.path.join(output_dir, requirement_files[group])
+        open(requirements_path, 'a').close()  # update_requirements_txt only updates existing files
+        added[group] = update_requirements_txt([package for package in packages if package in pypi_packages],
+                                               requirements_path, flag_confirm=False)
+    return added
+
+
+if __name__ == '__main__':
+    for group, packages in get_requirement_groups_from_filepath('../../').items():
+        print(f"{group}: {', '.join(packages)}")
@@ -0,0 +1,154 @@
+import os
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from pyprojectsetup import hlp_trace
+from pyprojectsetup.hlp_package import (DEFAULT_EXCLUDE_PACKAGES, DEFAULT_EXCLUDED_FOLDERS, analyze_py_files, find_files,
+                                        get_unique_packages)
+from pyprojectsetup.hpl_venv_install import get_venv_python
+
+
+def resolve_interpreter(python):
+    """Return the interpreter to run: `python` itself, or the python executable of `python` if it is a venv folder."""
+    if os.path.isdir(python):
+        return get_venv_python(python)
+    return python
+
+
+def parse_importtime(stderr):
+    """
+    Parse the output of `python -X importtime` into import trees.
+
+    Every line of the output reads `import time: <self us> | <cumulative us> | <indent><module>`, the indentation
+    giving the nesting depth, and a module is printed after all the modules it imported.
+
+    Args:
+        stderr (str): The stderr of a python process run with `-X importtime`.
+
+    Returns:
+        list of dict: The top level imports, in import order, each node being a dict with the keys 'name',
+            'self_us', 'cumulative_us' and 'children'.
+    """
+    pending = {}  # depth -> nodes waiting for their parent
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        node = {'name': name.strip(),
+                'self_us': int(fields[0]),
+                'cumulative_us': int(fields[1]),
+                'children': pending.pop(depth + 1, [])}
+        pending.setdefault(depth, []).append(node)
+    return pending.get(0, [])
+
+
+def profile_import(package, python_executable=sys.executable, cwd=None):
+    """
+    Measure the import of one package in a fresh interpreter.
+
+    The interpreter runs in an empty folder, so that a module of the caller's folder named like the package is not
+    imported instead of it.
+
+    Args:
+        package (str): The root package to import.
+        python_executable (str, optional): The interpreter (or virtual environment folder) to run. Defaults to the current one.
+        cwd (str, optional): Empty folder the interpreter runs in. Defaults to None (a new temporary folder).
+
+    Returns:
+        dict: The keys 'package', 'self_us', 'cumulative_us', 'tree' (see `parse_importtime`, None if the
+            package could not be imported), 'preloaded' (True if the package is already imported when the
+            interpreter starts, by a .pth file or sitecustomize for example, its import time is then unknown) and
+            'error' (None on success).
+    """
+    result = {'package': package, 'self_us': 0, 'cumulative_us': 0, 'tree': None, 'preloaded': False, 'error': None}
+    if not package.isidentifier():
+        result['error'] = f"Not an importable name: {package}"
+        return result
+    if cwd is None:
+        with tempfile.TemporaryDirectory() as empty_folder:
+            return profile_import(package, python_executable=python_executable, cwd=empty_folder)
+    try:
+        with hlp_trace.span('subprocess', 'importtime', package=package):
+            # the import statement is only reached when the package is not in sys.modules yet
+            code = f"import sys\nif {package!r} in sys.modules:\n    print('preloaded')\nimport {package}"
+            completed = subprocess.run([resolve_interpreter(python_executable), '-X', 'importtime', '-c', code],
+                                       capture_output=True, text=True, cwd=cwd)
+    except Exception as e:
+        result['error'] = str(e)
+        return result
+
+    for node in parse_importtime(completed.stderr):
+        if node['name'] == package:
+            result.update(self_us=node['self_us'], cumulative_us=node['cumulative_us'], tree=node)
+    result['preloaded'] = completed.stdout.strip() == 'preloaded'
+    if completed.returncode != 0:
+        result['error'] = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else f"exit code {completed.returncode}"
+    return result
+
+
+def profile_imports(packages, python_executable=sys.executable, max_workers=4):
+    """
+    Measure the import of several packages, each one in its own interpreter so that they do not share modules.
+
+    Args:
+        packages (list of str): The root packages to import.
+        python_executable (str, optional): The interpreter (or virtual environment folder) to run. Defaults to the current one.
+        max_workers (int, optional): Number of interpreters run in parallel. Defaults to 4.
+
+    Returns:
+        dict: package name -> result of `profile_import`.
+    """
+    with tempfile.TemporaryDirectory() as empty_folder, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda package: profile_import(package, python_executable, cwd=empty_folder), packages)
+        return {result['package']: result for result in results}
+
+
+def get_importers(imported_packages_dict, package):
+    """Return the sorted files of an `analyze_py_files` result that import `package` or one of its submodules."""
+    return sorted(file_name for file_name, imported_modules in imported_packages_dict.items()
+                  if any(module.split('.')[0] == package for module in imported_modules))
+
+
+def report_heaviest_imports(filepath, python_executable=sys.executable, top=10, excluded_folders=DEFAULT_EXCLUDED_FOLDERS,
+                            additional_exclude_packages=None, max_workers=4):
+    """
+    Rank the root packages imported by a project by their cumulative import time.
+
+    Args:
+        filepath (str): The project folder to scan.
+        python_executable (str, optional): The interpreter (or virtual environment folder) the project runs with.
+        top (int, optional): Number of packages reported, None for all. Defaults to 10.
+        excluded_folders (list of str, optional): Folders skipped by the scan. Defaults to DEFAULT_EXCLUDED_FOLDERS.
+        additional_exclude_packages (list of str, optional): Packages not profiled on top of DEFAULT_EXCLUDE_PACKAGES.
+        max_workers (int, optional): Number of interpreters run in parallel. Defaults to 4.
+
+    Returns:
+        list of dict: The `profile_import` results, heaviest first, with the times in milliseconds
+            ('self_ms', 'cumulative_ms') and the project files importing the package ('importers').
+    """
+    # the files of `scan`, notebooks included; relative imports are modules of the project, never profiled
+    results = analyze_py_files(find_files(filepath, ['*.py', '*.ipynb'], excluded_folders=excluded_folders),
+                               flag_full_path=True, flag_relative=False)
+    exclude_packages = set(DEFAULT_EXCLUDE_PACKAGES + (additional_exclude_packages or []))
+    packages = [pkg for pkg in get_unique_packages(results) if pkg not in exclude_packages and pkg.isidentifier()]
+
+    profiles = profile_imports(packages, python_executable=python_executable, max_workers=max_workers)
+    report = []
+    for package, profile in profiles.items():
+        profile['self_ms'] = profile['self_us'] / 1000
+        profile['cumulative_ms'] = profile['cumulative_us'] / 1000
+        profile['importers'] = get_importers(results, package)
+        report.append(profile)
+    report.sort(key=lambda profile: profile['cumulative_us'], reverse=True)
+    return report[:top] if top else report
+
+
+if __name__ == '__main__':
+    for profile in report_heaviest_imports('../../'):
+        print(f"{profile['cumulative_ms']:9.1f} ms  {profile['package']}  ({len(profile['importers'])} files)")
@@ -0,0 +1,287 @@
+"""
+Import scanning of Jupyter notebooks (.ipynb) with bounded memory.
+
+A notebook is read in chunks by a small streaming JSON reader: only the `cell_type` and `source` of every cell are
+decoded, everything else (outputs, embedded images, metadata) is skipped while being read, so a notebook of several
+hundred MB is scanned with about `chunk_size` bytes of buffer plus the code of one cell.
+"""
+import json
+import re
+
+from pyprojectsetup.hlp_package import extract_imports, get_requirement_name
+
+CHUNK_SIZE = 1 << 16
+
+_STRUCTURE = re.compile(r'["\[\]{}]')
+_SCALAR = re.compile(r'[^,\]}\s]+')
+_WHITESPACE = ' \t\r\n'
+
+
+class JsonStream:
+    """
+    Pull reader over a JSON text file, decoding only the values asked for.
+
+    Args:
+        file: A file opened in text mode.
+        chunk_size (int, optional): Characters read at a time. Defaults to CHUNK_SIZE.
+    """
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+
+    def _fill(self):
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non whitespace character without consuming it ('' at the end of the file)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, character):
+        if self.peek() != character:
+            raise ValueError(f"Invalid notebook JSON: expected {character!r}, found {self.peek()!r}")
+        self.pos += 1
+
+    def _scan_string(self, flag_keep):
+        """Read a string whose opening quote was consumed, return it decoded if flag_keep, else only skip it."""
+        parts = []
+        while True:
+            end = self.buffer.find('"', self.pos)
+            while end != -1:
+                start = end
+                while start > self.pos and self.buffer[start - 1] == '\\':
+                    start -= 1
+                if (end - start) % 2 == 0:  # not an escaped quote
+                    break
+                end = self.buffer.find('"', end + 1)
+            if end != -1:
+                if flag_keep:
+                    parts.append(self.buffer[self.pos:end])
+                self.pos = end + 1
+                return json.loads('"' + ''.join(parts) + '"', strict=False) if flag_keep else None
+            # no closing quote yet: consume the buffer, except a trailing run of backslashes that may escape it
+            cut = len(self.buffer)
+            while cut > self.pos and self.buffer[cut - 1] == '\\':
+                cut -= 1
+            if flag_keep:
+                parts.append(self.buffer[self.pos:cut])
+            self.pos = cut
+            if not self._fill():
+                raise ValueError("Invalid notebook JSON: unterminated string")
+
+    def _read_scalar(self):
+        token = ''
+        while True:
+            match = _SCALAR.match(self.buffer, self.pos)
+            if match:
+                token += match.group()
+                self.pos = match.end()
+            if self.pos < len(self.buffer) or not self._fill():
+                return json.loads(token)
+
+    def skip_value(self):
+        """Skip the next value without decoding it."""
+        character = self.peek()
+        if character == '"':
+            self.pos += 1
+            self._scan_string(False)
+        elif character in ('[', '{'):
+            depth = 0
+            while True:
+                match = _STRUCTURE.search(self.buffer, self.pos)
+                if match is None:
+                    self.pos = len(self.buffer)
+                    if not self._fill():
+                        raise ValueError("Invalid notebook JSON: unterminated container")
+                    continue
+                self.pos = match.end()
+                if match.group() == '"':
+                    self._scan_string(False)
+                elif match.group() in '[{':
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return
+        else:
+            self._read_scalar()
+
+    def read_value(self):
+        """Decode and return the next value."""
+        character = self.peek()
+        if character == '"':
+            self.pos += 1
+            return self._scan_string(True)
+        if character == '[':
+            return [self.read_value() for _ in self.iter_array()]
+        if character == '{':
+            return {key: self.read_value() for key in self.iter_object()}
+        return self._read_scalar()
+
+    def iter_array(self):
+        """Iterate over an array, the caller reads or skips one value per iteration."""
+        self._expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            character = self.peek()
+            self.pos += 1
+            if character == ']':
+                return
+            if character != ',':
+                raise ValueError(f"Invalid notebook JSON: expected ',' or ']', found {character!r}")
+
+    def iter_object(self):
+        """Iterate over the keys of an object, the caller reads or skips the value of every key."""
+        self._expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            self._expect('"')
+            key = self._scan_string(True)
+            self._expect(':')
+            yield key
+            character = self.peek()
+            self.pos += 1
+            if character == '}':
+                return
+            if character != ',':
+                raise ValueError(f"Invalid notebook JSON: expected ',' or '}}', found {character!r}")
+
+
+def _iter_cells(stream):
+    for _ in stream.iter_array():
+        if stream.peek() != '{':
+            stream.skip_value()
+            continue
+        cell_type, source = None, None
+        for key in stream.iter_object():
+            if key == 'cell_type':
+                cell_type = stream.read_value()
+            elif key in ('source', 'input') and cell_type in (None, 'code'):  # 'input' in nbformat 3
+                source = stream.read_value()
+            else:
+                stream.skip_value()
+        if cell_type == 'code' and source is not None:
+            yield ''.join(source) if isinstance(source, list) else source
+
+
+def iter_code_cells(file_path, chunk_size=CHUNK_SIZE):
+    """
+    Yield the source of every code cell of a notebook, streaming the file (nbformat 3 and 4).
+
+    Args:
+        file_path (str): Path of the .ipynb file.
+        chunk_size (int, optional): Characters read at a time. Defaults to CHUNK_SIZE.
+
+    Raises:
+        ValueError: If the file is not valid notebook JSON.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        stream = JsonStream(file, chunk_size=chunk_size)
+        for key in stream.iter_object():
+            if key == 'cells':
+                yield from _iter_cells(stream)
+            elif key == 'worksheets':
+                for _ in stream.iter_array():
+                    for worksheet_key in stream.iter_object():
+                        if worksheet_key == 'cells':
+                            yield from _iter_cells(stream)
+                        else:
+                            stream.skip_value()
+            else:
+                stream.skip_value()
+
+
+_PIP_MAGIC = re.compile(r'^[%!]\s*(?:python3?\s+-m\s+)?pip3?\s+install\s+(.*)$')
+_ASSIGNED_MAGIC = re.compile(r'^(\s*[\w.]+\s*=\s*)[%!].*$')
+_PIP_OPTIONS_WITH_VALUE = {'-r', '--requirement', '-c', '--constraint', '-e', '--editable', '-i', '--index-url',
+                           '--extra-index-url', '-f', '--find-links', '-t', '--target', '--prefix', '--root'}
+_PYTHON_CELL_MAGICS = {'%%time', '%%timeit', '%%capture', '%%prun', '%%debug'}
+
+
+def get_pip_magic_packages(line):
+    """Return the distribution names installed by a `%pip install` / `!pip install` line (empty list otherwise)."""
+    match = _PIP_MAGIC.match(line.strip())
+    if match is None:
+        return []
+    packages, skip_next = [], False
+    for token in match.group(1).split():
+        token = token.strip('"\'')
+        if skip_next:
+            skip_next = False
+        elif token.startswith('-'):
+            skip_next = token in _PIP_OPTIONS_WITH_VALUE
+        else:
+            name = get_requirement_name(token)
+            if name:
+                packages.append(name)
+    return packages
+
+
+def cell_to_python(source):
+    """
+    Turn the source of a code cell into plain python, listing the packages installed by its pip magics.
+
+    Line magics and shell escapes (`%matplotlib inline`, `!ls`, `files = !ls`) are replaced by python statements
+    that keep the indentation valid, cells run by another interpreter (`%%bash`, `%%html`...) are dropped.
+
+    Returns:
+        tuple: (python source, list of distribution names installed with %pip / !pip)
+    """
+    lines = source.splitlines()
+    if lines and lines[0].lstrip().startswith('%%'):
+        if lines[0].split()[0] not in _PYTHON_CELL_MAGICS:
+            return '', []
+        lines = lines[1:]
+
+    python_lines, pip_packages = [], []
+    for line in lines:
+        stripped = line.lstrip()
+        if stripped.startswith(('%', '!')):
+            pip_packages.extend(get_pip_magic_packages(stripped))
+            python_lines.append(line[:len(line) - len(stripped)] + 'pass')
+        elif _ASSIGNED_MAGIC.match(line):
+            python_lines.append(_ASSIGNED_MAGIC.match(line).group(1) + 'None')
+        else:
+            python_lines.append(line)
+    return '\n'.join(python_lines), pip_packages
+
+
+def analyze_notebook(file_path, chunk_size=CHUNK_SIZE, flag_relative=True):
+    """
+    Return the imports of a notebook and the packages installed by its pip magics.
+
+    A cell that does not parse is skipped, the other cells are still analyzed. flag_relative keeps the relative
+    imports, see `extract_imports`.
+
+    Returns:
+        tuple: (imports in the `analyze_py_files` format, distribution names installed with %pip / !pip). The
+            distribution names are requirement names, not import names (`scikit-learn` is imported as `sklearn`),
+            they are kept apart from the imports.
+    """
+    imported_modules, pip_packages = [], []
+    for source in iter_code_cells(file_path, chunk_size=chunk_size):
+        python_source, cell_packages = cell_to_python(source)
+        pip_packages.extend(cell_packages)
+        try:
+            imported_modules.extend(extract_imports(python_source, flag_relative=flag_relative))
+        except SyntaxError:
+            continue
+    return imported_modules, pip_packages
@@ -1,8 +1,28 @@
 import ast
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import requests
 import os
 import glob
+import re
+
+from pyprojectsetup import hlp_trace
+
+PYPI_URL = "https://pypi.org/pypi/{}/json"  # JSON API of the package index, {} is the package name
+DEFAULT_EXCLUDED_FOLDERS = ['venv', '.ipynb_checkpoints']  # checkpoints are copies of the notebooks next to them
+DEFAULT_EXCLUDE_PACKAGES = ['unittest','ast','os', 'math', 'cmath', 'glob', 'concurrent', 're', 'shutil', 'subprocess',
+                            'sys'] # list of known packages from native python that should be excluded
+
+def is_excluded_path(path, excluded_folders, root=None):
+    """
+    Return True if a path contains one of the excluded folder names, the rule of `find_files`.
+
+    Args:
+        path (str): The file or folder path.
+        excluded_folders (list of str): Partial names of the excluded folders.
+        root (str, optional): Project folder the path is matched relative to, so that the folders above the project
+            never exclude it. Defaults to None (the path is matched as given).
+    """
+    if root is not None:
+        path = os.path.relpath(path, root)
+    return any(partial in path for partial in excluded_folders)
 
 def find_files(path, pattern, excluded_folders = None):
     """
@@ -11,36 +31,27 @@ def find_files(path, pattern, excluded_folders = None):
     Args:
         path: path to look ex : './folder'
         pattern: pattern of the file to look '*.json'
+        excluded_folders: skip the files whose path relative to `path` contains one of these names, see
+            `is_excluded_path`
 
     Returns: list of the different matching file
 
     """
 
-    def exclude_partial_match(folder_list, partial_matches):
-        """
-        Exclude folders with names containing any of the partial matches from a list of folders.
-
-        :param folder_list: List of folder paths
-        :param partial_matches: List of partial match strings to exclude
-        :return: Filtered list of folders
-        """
-        filtered_folders = [folder for folder in folder_list if
-                            all(partial not in folder for partial in partial_matches)]
-        return filtered_folders
     files = []
 
-    if type(pattern) is list:
-        for pattern_item in pattern:
-            for root, dirs, filenames in os.walk(path):
+    with hlp_trace.span('walk', path=path, pattern=pattern):
+        patterns = pattern if type(pattern) is list else [pattern]
+        for root, dirs, filenames in os.walk(path):  # one walk for all the patterns
+            if excluded_folders is not None:  # excluded folders are not walked
+                dirs[:] = [name for name in dirs
+                           if not is_excluded_path(os.path.join(root, name), excluded_folders, root=path)]
+            for pattern_item in patterns:
                 for filename in glob.fnmatch.filter(filenames, pattern_item):
                     files.append(os.path.join(root, filename))
-    else:
-        for root, dirs, filenames in os.walk(path):
-            for filename in glob.fnmatch.filter(filenames, pattern):
-                files.append(os.path.join(root, filename))
 
     if excluded_folders is not None:
-       files = exclude_partial_match(files, excluded_folders)
+        files = [file for file in files if not is_excluded_path(file, excluded_folders, root=path)]
     return files
 
 def collect_imports(node):
@@ -64,14 +75,66 @@ def collect_imports(node):
     elif isinstance(node, ast.ImportFrom):
         return [f"{node.module}.{name.name}" for name in node.names]
 
-def analyze_py_files(file_paths):
+def extract_imports(source, flag_relative=True):
+    """
+    Return the modules and symbols imported by a python source, in the format of `collect_imports`.
+
+    Args:
+        source (str or bytes): The python code, bytes honour the encoding declared by the code.
+        flag_relative (bool, optional): Keep the relative imports, `from .module import name` gives 'module.name'
+            and `from . import name` gives 'None.name'. Defaults to True.
+
+    Raises:
+        SyntaxError: If the source does not parse.
+    """
+    imported_modules = []
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.ImportFrom) and node.level and not flag_relative:
+            continue
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            imported_modules.extend(collect_imports(node))
+    return imported_modules
+
+def read_imports(file_path, pip_packages=None, flag_relative=True):
+    """
+    Return the imports of a python file or notebook, in the format of `collect_imports`, counting the file in the trace.
+
+    Args:
+        file_path (str): A .py file, or a .ipynb notebook analyzed with `hlp_notebook.analyze_notebook`.
+        pip_packages (list, optional): Extended with the distribution names installed by the %pip / !pip magics of
+            a notebook, they are not imports. Defaults to None (the magics are ignored).
+        flag_relative (bool, optional): Keep the relative imports, see `extract_imports`. Defaults to True.
+
+    Raises:
+        OSError, SyntaxError, ValueError: If the file cannot be read or parsed.
+    """
+    with hlp_trace.span('parse', file=file_path):
+        if file_path.endswith('.ipynb'):
+            from pyprojectsetup.hlp_notebook import analyze_notebook
+            hlp_trace.count('files_scanned')
+            hlp_trace.count('bytes_read', os.path.getsize(file_path))
+            imported_modules, notebook_packages = analyze_notebook(file_path, flag_relative=flag_relative)
+            if pip_packages is not None:
+                pip_packages.extend(notebook_packages)
+            return imported_modules
+        with open(file_path, 'rb') as file:  # bytes, so that ast honours the encoding declared by the file
+            source = file.read()
+        hlp_trace.count('files_scanned')
+        hlp_trace.count('bytes_read', len(source))
+        return extract_imports(source, flag_relative=flag_relative)
+
+def analyze_py_files(file_paths, flag_full_path=False, flag_relative=True):
     """
     Analyzes Python files to extract imported modules and symbols.
 
     This function takes a list of file paths to Python files and analyzes each file to extract imported modules and symbols. For each file, it parses the file's Abstract Syntax Tree (AST) and collects import statements. The result is a dictionary where each key is the name of a Python file, and the corresponding value is a list of imported modules and symbols.
 
     Args:
-        file_paths (List[str]): A list of file paths to Python (.py) files to analyze.
+        file_paths (List[str]): A list of file paths to Python (.py) files or Jupyter notebooks (.ipynb) to analyze.
+            The code cells of a notebook are analyzed (see `hlp_notebook.analyze_notebook`).
+        flag_full_path (bool, optional): Key the results by file path instead of file name, so that files sharing
+            a name (`__init__.py`, ...) in different folders are all kept. Defaults to False.
+        flag_relative (bool, optional): Keep the relative imports, see `extract_imports`. Defaults to True.
 
     Returns:
         Dict[str, List[str]]: A dictionary where keys are file names and values are lists of imported modules and symbols.
@@ -97,18 +160,10 @@ def analyze_py_files(file_paths):
     results = {}
 
     for file_path in file_paths:
-        file_name = file_path.split('/')[-1]  # Extract the file name from the path
-        imported_modules = []
+        file_name = file_path if flag_full_path else file_path.split('/')[-1]  # Extract the file name from the path
 
         try:
-            with open(file_path, 'r') as file:
-                tree = ast.parse(file.read())
-
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.Import, ast.ImportFrom)):
-                    imported_modules.extend(collect_imports(node))
-
-            results[file_name] = imported_modules
+            results[file_name] = read_imports(file_path, flag_relative=flag_relative)
         except Exception as e:
             results[file_name] = [f"Error analyzing file: {str(e)}"]
 
@@ -134,28 +189,13 @@ def get_unique_packages(imported_packages_dict):
           The function considers the root package as the first part of a package name before the first dot ('.') character.
 
       """
-    def get_root_packages(imported_packages):
-        root_packages = set()
-
-        for package in imported_packages:
-            root_package = package.split('.')[0]  # Extract the root package
-            root_packages.add(root_package)
-
-        return sorted(list(root_packages))  # Convert to list and sort
-
-    all_imports = []
-
-    # Merge all the imported packages into one list
-    for imported_modules in imported_packages_dict.values():
-        all_imports.extend(imported_modules)
-
-    # Use set to remove duplicates and then convert back to a list
-    unique_packages = list(set(all_imports))
+    # one set of root packages, without merging the imports of all the files into intermediate lists
+    return sorted({package.split('.')[0]
+                   for imported_modules in imported_packages_dict.values() for package in imported_modules})
 
-    return get_root_packages(unique_packages)
 
-
-def get_unique_packages_from_filepath(filepath, flag_exclude=True, additional_exclude_packages=None, excluded_folders = ['venv'], flag_verbose = False):
+def get_unique_packages_from_filepath(filepath, flag_exclude=True, additional_exclude_packages=None, excluded_folders=DEFAULT_EXCLUDED_FOLDERS, flag_verbose = False,
+                                      flag_notebooks=True, pip_packages=None):
     """
     Extracts and returns a list of unique packages used in Python files within the specified directory.
 
@@ -163,24 +203,30 @@ def get_unique_packages_from_filepath(filepath, flag_exclude=True, additional_ex
     - filepath (str): The file path where Python files are located.
     - flag_exclude (bool, optional): A flag to determine if default packages should be excluded. Defaults to True.
     - additional_exclude_packages (list of str, optional): Additional packages to exclude. Defaults to None.
+    - flag_notebooks (bool, optional): Also scan the Jupyter notebooks (*.ipynb). Defaults to True.
+    - pip_packages (list, optional): Extended with the distribution names the notebooks install with %pip / !pip,
+      requirements as they are written and not imports. Defaults to None.
 
     Returns:
     - list: A list of unique packages used in the Python files, excluding specified packages if flag_exclude is True.
     """
+    from pyprojectsetup.hlp_scan_store import scan_files  # interned results, memory grows with the distinct names
 
-    file_paths = find_files(filepath, '*.py', excluded_folders=excluded_folders)
-    results = analyze_py_files(file_paths)
+    patterns = ['*.py', '*.ipynb'] if flag_notebooks else '*.py'
+    file_paths = find_files(filepath, patterns, excluded_folders=excluded_folders)
+    store = scan_files(file_paths, pip_packages=pip_packages)
 
     if flag_verbose:# Print the results
-        for file_name, imported_modules in results.items():
+        for row, file_name in enumerate(store.files):
             print(f"File: {file_name}")
-            for module in imported_modules:
-                print(f"  Import: {module}")
+            if row in store.errors:
+                print(f"  Error analyzing file: {store.errors[row]}")
+            for module_id in store.get_module_ids(row):
+                print(f"  Import: {store.modules[module_id]}")
 
-    unique_packages = get_unique_packages(results)
+    unique_packages = store.get_unique_packages()
 
-    exclude_packages = ['unittest','ast','os', 'math', 'cmath', 'glob', 'concurrent', 're', 'shutil', 'subprocess',
-                        'sys'] # list of known packages from native python that should be excluded
+    exclude_packages = list(DEFAULT_EXCLUDE_PACKAGES)
     if additional_exclude_packages:
         exclude_packages.extend(additional_exclude_packages)
 
@@ -192,21 +238,28 @@ def get_unique_packages_from_filepath(filepath, flag_exclude=True, additional_ex
     return unique_packages
 
 # check if package are homemade or existing
-def check_pypi(package_name):
-    """Check if a package is available on PyPI."""
+def check_pypi(package_name, index_url=PYPI_URL):
+    """Check if a package is available on PyPI (or on the index whose JSON API is index_url)."""
+    import requests  # imported here so that scanning a project does not pay for requests at startup
+
+    hlp_trace.count('requests')
     try:
-        response = requests.get(f"https://pypi.org/pypi/{package_name}/json", timeout=5)
+        with hlp_trace.span('http', 'classify', package=package_name):
+            response = requests.get(index_url.format(package_name), timeout=5)
         return package_name, response.status_code == 200
     except requests.RequestException:
+        hlp_trace.count('request_errors')
         return package_name, False
 
-def categorize_packages(package_names, filepath = '.'):
-    """Categorize packages into PyPI, local Python files, or undetermined."""
+def categorize_packages(package_names, filepath = '.', index_url=PYPI_URL):
+    """Categorize packages into PyPI, local Python files, or undetermined (see `check_pypi` for index_url)."""
+    from concurrent.futures import ThreadPoolExecutor, as_completed  # only needed once packages are classified
+
     pypi_packages = []
     undetermined_packages = []
 
     # Check for local Python files first to reduce unnecessary PyPI checks
-    all_files = {f[:-3] for f in os.listdir(filepath) if os.path.isfile(filepath+f) and f.endswith('.py')}
+    all_files = {f[:-3] for f in os.listdir(filepath) if os.path.isfile(os.path.join(filepath, f)) and f.endswith('.py')}
     localpy_packages = [name for name in package_names if name in all_files]
 
     # Prepare a list for PyPI checks excluding those already found locally
@@ -214,7 +267,7 @@ def categorize_packages(package_names, filepath = '.'):
 
     # Concurrently check remaining packages on PyPI
     with ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_package = {executor.submit(check_pypi, pkg): pkg for pkg in remaining_checks}
+        future_to_package = {executor.submit(check_pypi, pkg, index_url): pkg for pkg in remaining_checks}
         for future in as_completed(future_to_package):
             package_name, is_pypi = future.result()
             if is_pypi:
@@ -224,20 +277,47 @@ def categorize_packages(package_names, filepath = '.'):
 
     return pypi_packages, localpy_packages, undetermined_packages
 
-def update_requirements_txt(dependencies, requirements_path):
+def normalize_package_name(name):
+    """Normalize a distribution name as pip does (PEP 503): 'Foo_Bar.baz' -> 'foo-bar-baz'."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+def get_requirement_name(requirement):
+    """
+    Return the distribution name of a requirement specifier, or None if the line is not a named requirement.
+
+    Example:
+        'requests[socks]>=2.0 ; python_version > "3.7"' -> 'requests', '-r other.txt' -> None, '# comment' -> None
+    """
+    requirement = requirement.split('#')[0].strip()
+    if not requirement or requirement.startswith('-') or '://' in requirement.split('@')[0]:
+        return None
+    match = re.match(r"[A-Za-z0-9][A-Za-z0-9._-]*", requirement)
+    return match.group(0) if match else None
+
+def read_requirements(requirements_path):
+    """Return the distribution names listed in a requirements.txt file, in file order (options and URLs are skipped)."""
+    with open(requirements_path, 'r') as file:
+        names = [get_requirement_name(line) for line in file]
+    return [name for name in names if name]
+
+def update_requirements_txt(dependencies, requirements_path, flag_confirm=True):
     """
     Updates a requirements.txt file with new dependencies.
 
     This function takes a list of dependencies extracted from project files and compares them to the packages listed
-    in a requirements.txt file. If any new packages are found in the dependencies that are not already listed in the
-    requirements.txt file, the user is prompted to add them to the file.
+    in a requirements.txt file by normalized distribution name (`numpy==1.2` lists `numpy`). If any new packages are
+    found in the dependencies that are not already listed in the requirements.txt file, the user is prompted to add
+    them to the file.
 
     Args:
         dependencies (list): A list of imported packages extracted from project files.
         requirements_path (str): The file path to the requirements.txt file to update.
+        flag_confirm (bool, optional): Ask the user before writing. If False the new packages are added without
+            prompting, which is what non-interactive callers (CLI, CI) need. Defaults to True.
 
     Returns:
-        None
+        list: The sorted packages that were missing from requirements.txt, None if the file could not be read or
+            written.
 
     Example:
         Given `dependencies` as ['os', 'numpy', 'requests'], and the contents of
@@ -254,20 +334,27 @@ def update_requirements_txt(dependencies, requirements_path):
         ```
 
     """
+    new_packages = []
     try:
         with open(requirements_path, 'r') as file:
-            existing_packages = {line.strip() for line in file}
+            content = file.read()
+        existing_packages = {normalize_package_name(name) for name in read_requirements(requirements_path)}
 
-        new_packages = set(dependencies) - existing_packages
+        new_packages = {}  # normalized name -> first spelling, a pinned or differently spelled entry is listed
+        for package in dependencies:
+            new_packages.setdefault(normalize_package_name(package), package)
+        new_packages = sorted(package for name, package in new_packages.items() if name not in existing_packages)
 
         if new_packages:
             print("The following packages are not listed in requirements.txt:")
             for package in new_packages:
                 print(package)
 
-            choice = input("Do you want to add them to requirements.txt? (y/n): ")
+            choice = input("Do you want to add them to requirements.txt? (y/n): ") if flag_confirm else 'y'
             if choice.lower() == 'y':
                 with open(requirements_path, 'a') as file:
+                    if content and not content.endswith('\n'):
+                        file.write('\n')
                     for package in new_packages:
                         file.write(f"{package}\n")
         else:
@@ -275,8 +362,11 @@ def update_requirements_txt(dependencies, requirements_path):
 
     except FileNotFoundError:
         print(f"Error: requirements.txt file not found at {requirements_path}.")
+        return None
     except Exception as e:
         print(f"An error occurred while updating requirements.txt: {e}")
+        return None
+    return new_packages
 
 
 
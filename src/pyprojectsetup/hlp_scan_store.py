@@ -0,0 +1,331 @@
+"""
+Compact store of scan results, for projects with millions of import statements.
+
+`analyze_py_files` keeps one python string per import statement. `ScanStore` interns every distinct module name
+("module" or "module.symbol") into an integer id instead, and keeps the imports of all the files as two array columns
+(compressed sparse rows): `imports` holds the module ids of every file one after the other and `offsets[i]` is where
+the imports of file i start. The memory used per statement is 4 bytes, the names are stored once.
+
+Every module id maps to the id of its root package (`module_roots`), so the root packages of a project are a set of
+small integers and set operations between projects, revisions or groups of files run on ints.
+
+A store is saved as a header followed by the raw bytes of its arrays; `ScanStore.load` maps the file and reads the
+arrays in place (memoryviews over the mapping), nothing is parsed or copied until a string is asked for.
+"""
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from pyprojectsetup.hlp_package import DEFAULT_EXCLUDE_PACKAGES, read_imports
+
+MAGIC = b'PPSTORE1'
+_HEADER = struct.Struct('<8sc7x10Q')  # magic, byte order, size in bytes of the 10 sections
+_ALIGNMENT = 8
+
+
+def _to_array(typecode, values):
+    """Return values as an array, copying the bytes of a memoryview in one go."""
+    if isinstance(values, array):
+        return values
+    copy = array(typecode)
+    copy.frombytes(values.cast('B'))
+    return copy
+
+
+class StringTable:
+    """
+    Interned strings: the utf-8 bytes of all the strings in one blob, string i being blob[offsets[i]:offsets[i + 1]].
+
+    The string -> id dict is only built when a string is looked up, a loaded table read by id never builds it.
+    """
+
+    def __init__(self, offsets=None, blob=None):
+        self.offsets = array('q', [0]) if offsets is None else offsets
+        self.blob = bytearray() if blob is None else blob
+        self._ids = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, string_id):
+        return str(self.blob[self.offsets[string_id]:self.offsets[string_id + 1]], 'utf-8', 'surrogateescape')
+
+    def __iter__(self):
+        return (self[string_id] for string_id in range(len(self)))
+
+    def _index(self):
+        if self._ids is None:
+            self._ids = {}
+            for string_id, string in enumerate(self):
+                self._ids.setdefault(string, string_id)
+        return self._ids
+
+    def _writable(self):
+        if not isinstance(self.offsets, array):  # loaded from a file: copy before growing
+            self.offsets, self.blob = _to_array('q', self.offsets), bytearray(self.blob)
+
+    def find(self, string):
+        """Return the id of a string, None if it is not in the table."""
+        return self._index().get(string)
+
+    def append(self, string):
+        """Add a string without looking for a previous copy, return its id."""
+        self._writable()
+        string_id = len(self)
+        self.blob += string.encode('utf-8', 'surrogateescape')
+        self.offsets.append(len(self.blob))
+        if self._ids is not None:
+            self._ids.setdefault(string, string_id)
+        return string_id
+
+    def intern(self, string):
+        """Return the id of a string, adding it to the table first if needed."""
+        string_id = self._index().get(string)
+        if string_id is None:
+            string_id = self.append(string)
+        return string_id
+
+
+class ScanStore:
+    """
+    Imports of a set of files, in the format of `analyze_py_files` but interned and stored in arrays.
+
+    Attributes:
+        modules (StringTable): Distinct imported names, "module" or "module.symbol" as in `collect_imports`.
+        roots (StringTable): Distinct root packages.
+        files (StringTable): File names (or paths), one per row, in the order they were added.
+        module_roots (array): module id -> root package id.
+        offsets (array): file row -> start of its imports in `imports`, one more item than files.
+        imports (array): module ids imported by all the files, file after file.
+        errors (dict): file row -> error message, for the files that could not be analyzed (stored with no import).
+    """
+
+    def __init__(self):
+        self.modules = StringTable()
+        self.roots = StringTable()
+        self.files = StringTable()
+        self.module_roots = array('i')
+        self.offsets = array('q', [0])
+        self.imports = array('i')
+        self.errors = {}
+        self._rows = None  # file name -> last row, built on the first lookup
+        self._mmap = None
+        self._views = []
+
+    def __len__(self):
+        return len(self.files)
+
+    def _writable(self):
+        self.module_roots = _to_array('i', self.module_roots)
+        self.offsets = _to_array('q', self.offsets)
+        self.imports = _to_array('i', self.imports)
+
+    def intern_module(self, module):
+        """Return the id of an imported name, adding it (and its root package) if needed."""
+        module_id = self.modules.find(module)
+        if module_id is None:
+            self._writable()
+            module_id = self.modules.append(module)
+            self.module_roots.append(self.roots.intern(module.split('.')[0]))
+        return module_id
+
+    def add_file(self, file_name, imported_modules, error=None):
+        """
+        Add a file and its imports.
+
+        Args:
+            file_name (str): Name or path of the file. A name added twice has two rows: `get_imports` returns the
+                imports of the last one, the root packages of both are counted.
+            imported_modules (iterable of str): The imports, as returned by `collect_imports`.
+            error (str, optional): Why the file could not be analyzed.
+
+        Returns:
+            int: The row of the file.
+        """
+        self._writable()
+        self.imports.extend(self.intern_module(module) for module in imported_modules)
+        self.offsets.append(len(self.imports))
+        row = self.files.append(file_name)
+        if error is not None:
+            self.errors[row] = error
+        if self._rows is not None:
+            self._rows[file_name] = row
+        return row
+
+    def _row(self, file_name):
+        if self._rows is None:
+            self._rows = {name: row for row, name in enumerate(self.files)}
+        return self._rows.get(file_name)
+
+    def get_module_ids(self, row):
+        """Return the module ids imported by the file of a row (a slice of `imports`)."""
+        return self.imports[self.offsets[row]:self.offsets[row + 1]]
+
+    def get_imports(self, file_name):
+        """Return the imports of a file as strings, None if the file is not in the store."""
+        row = self._row(file_name)
+        if row is None:
+            return None
+        return [self.modules[module_id] for module_id in self.get_module_ids(row)]
+
+    def to_dict(self):
+        """Return the results in the `analyze_py_files` format (this allocates one string per import)."""
+        results = {}
+        for row, file_name in enumerate(self.files):
+            if row in self.errors:
+                results[file_name] = [f"Error analyzing file: {self.errors[row]}"]
+            else:
+                results[file_name] = [self.modules[module_id] for module_id in self.get_module_ids(row)]
+        return results
+
+    def get_root_ids(self, rows=None):
+        """
+        Return the ids of the root packages imported by some files.
+
+        Args:
+            rows (iterable of int, optional): Rows of the files. Defaults to None (all the files).
+
+        Returns:
+            frozenset of int: Root package ids, names in `roots`.
+        """
+        if rows is None:
+            module_ids = set(self.imports)
+        else:
+            module_ids = set()
+            for row in rows:
+                module_ids.update(self.get_module_ids(row))
+        module_roots = self.module_roots
+        return frozenset(module_roots[module_id] for module_id in module_ids)
+
+    def get_root_id(self, package):
+        """Return the id of a root package, None if no file imports it."""
+        return self.roots.find(package)
+
+    def get_packages(self, root_ids):
+        """Return the sorted names of root package ids."""
+        return sorted(self.roots[root_id] for root_id in root_ids)
+
+    def get_unique_packages(self, exclude_packages=None):
+        """
+        Return the sorted root packages imported by all the files, as `get_unique_packages` does.
+
+        Args:
+            exclude_packages (iterable of str, optional): Packages left out. Defaults to None.
+        """
+        root_ids = self.get_root_ids()
+        if exclude_packages:
+            root_ids -= {self.roots.find(package) for package in exclude_packages}
+        return self.get_packages(root_ids)
+
+    def get_importers(self, package):
+        """Return the files importing a root package or one of its submodules, in row order."""
+        root_id = self.roots.find(package)
+        if root_id is None:
+            return []
+        module_ids = {module_id for module_id, module_root in enumerate(self.module_roots) if module_root == root_id}
+        return [self.files[row] for row in range(len(self.files)) if not module_ids.isdisjoint(self.get_module_ids(row))]
+
+    def _sections(self):
+        errors = json.dumps(self.errors).encode()
+        return [memoryview(self.modules.offsets), memoryview(self.modules.blob), memoryview(self.roots.offsets),
+                memoryview(self.roots.blob), memoryview(self.files.offsets), memoryview(self.files.blob),
+                memoryview(self.module_roots), memoryview(self.offsets), memoryview(self.imports), memoryview(errors)]
+
+    def save(self, path):
+        """Write the store to a file that `load` maps without parsing it."""
+        sections = [section.cast('B') for section in self._sections()]
+        with open(path, 'wb') as file:
+            file.write(_HEADER.pack(MAGIC, sys.byteorder[0].encode(), *(section.nbytes for section in sections)))
+            for section in sections:
+                file.write(section)
+                file.write(b'\0' * (-section.nbytes % _ALIGNMENT))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Map a file written by `save`, the arrays are read in place until the store is modified.
+
+        Raises:
+            ValueError: If the file is not a store written on a machine with the same byte order.
+        """
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(buffer) < _HEADER.size or buffer[:len(MAGIC)] != MAGIC:
+            buffer.close()
+            raise ValueError(f"Not a scan store: {path}")
+        _, byteorder, *sizes = _HEADER.unpack_from(buffer)
+        if byteorder != sys.byteorder[0].encode():
+            buffer.close()
+            raise ValueError(f"Scan store written with another byte order: {path}")
+
+        store = cls()
+        store._mmap = buffer
+        view = memoryview(buffer)
+        store._views.append(view)
+        sections, pos = [], _HEADER.size
+        for size, typecode in zip(sizes, 'qBqBqBiqiB'):
+            section = view[pos:pos + size]
+            store._views.append(section)
+            if typecode != 'B':
+                section = section.cast(typecode)
+                store._views.append(section)
+            sections.append(section)
+            pos += size + (-size % _ALIGNMENT)
+        store.modules = StringTable(sections[0], sections[1])
+        store.roots = StringTable(sections[2], sections[3])
+        store.files = StringTable(sections[4], sections[5])
+        store.module_roots, store.offsets, store.imports = sections[6:9]
+        store.errors = {int(row): error for row, error in json.loads(bytes(sections[9]) or b'{}').items()}
+        return store
+
+    def close(self):
+        """Copy the mapped arrays into memory and unmap the file of a loaded store."""
+        if self._mmap is None:
+            return
+        self._writable()
+        for table in (self.modules, self.roots, self.files):
+            table._writable()
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+        self._mmap = None
+
+
+def scan_files(file_paths, flag_full_path=False, store=None, pip_packages=None):
+    """
+    Analyze python files and notebooks into a `ScanStore`, as `analyze_py_files` does into a dict.
+
+    Only the imports of the file being parsed exist as strings, so the memory grows with the number of distinct
+    imported names and not with the number of import statements.
+
+    Args:
+        file_paths (list of str): The .py / .ipynb files to analyze.
+        flag_full_path (bool, optional): Name the files by path instead of file name. Defaults to False.
+        store (ScanStore, optional): Store to add the files to. Defaults to None (a new store).
+        pip_packages (list, optional): Extended with the distribution names installed by the pip magics of the
+            notebooks, see `read_imports`. Defaults to None.
+
+    Returns:
+        ScanStore: The store.
+    """
+    store = ScanStore() if store is None else store
+    for file_path in file_paths:
+        file_name = file_path if flag_full_path else file_path.split('/')[-1]
+        try:
+            imported_modules = read_imports(file_path, pip_packages)
+        except Exception as e:
+            store.add_file(file_name, [], error=str(e))
+        else:
+            store.add_file(file_name, imported_modules)
+    return store
+
+
+if __name__ == '__main__':
+    from pyprojectsetup.hlp_package import find_files
+
+    scan_store = scan_files(find_files('../../', '*.py', excluded_folders=['venv']), flag_full_path=True)
+    print(f"{len(scan_store)} files, {len(scan_store.imports)} imports, {len(scan_store.modules)} distinct names")
+    print(scan_store.get_unique_packages(DEFAULT_EXCLUDE_PACKAGES))
@@ -0,0 +1,170 @@
+"""
+Low overhead instrumentation of the scan / classify / install phases.
+
+The helpers record spans (timed phases: a folder walk, a file parse, an HTTP request, a subprocess) and counters
+(files scanned, bytes read, cache hits, requests...). Tracing is disabled by default, `span` then returns a shared
+no-op context manager and `count` returns immediately. Enable it around a run and give it sinks to export the result:
+
+    tracer = enable([ChromeTraceSink('trace.json'), SummarySink()])
+    ... run the scan ...
+    disable()  # the sinks are written here
+
+The Chrome trace can be opened in chrome://tracing or https://ui.perfetto.dev.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+_tracer = None
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        self.tracer.spans.append((self.name, self.category, self.start, end - self.start, threading.get_ident(), self.args))
+        return False
+
+
+class Tracer:
+    """
+    Collect spans and counters in memory until `close` hands them to the sinks.
+
+    Attributes:
+        spans (list of tuple): (name, category, start ns, duration ns, thread id, args) of every finished span.
+        counters (dict): counter name -> value.
+        start (int): perf_counter_ns when tracing started, the origin of the exported timestamps.
+    """
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self.spans = []
+        self.counters = {}
+        self.start = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def span(self, name, category, args):
+        return _Span(self, name, category, args)
+
+    def count(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def close(self):
+        for sink in self.sinks:
+            sink.write(self)
+
+
+def enable(sinks=()):
+    """Start tracing into a new `Tracer` writing to `sinks` when disabled, and return it."""
+    global _tracer
+    _tracer = Tracer(sinks)
+    return _tracer
+
+
+def disable():
+    """Stop tracing, write the sinks and return the tracer (None if tracing was not enabled)."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
+    return tracer
+
+
+def is_enabled():
+    return _tracer is not None
+
+
+def span(name, category='scan', **args):
+    """
+    Return a context manager timing the phase `name`.
+
+    Args:
+        name (str): Name of the phase, ex : 'walk', 'parse', 'http', 'subprocess'.
+        category (str, optional): Group of the phase in the trace. Defaults to 'scan'.
+        **args: Details stored with the span (file path, url, command...).
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, category, args)
+
+
+def count(name, value=1):
+    """Add value to the counter `name` (files_scanned, bytes_read, cache_hits, requests...)."""
+    if _tracer is not None:
+        _tracer.count(name, value)
+
+
+class ChromeTraceSink:
+    """Write the spans and counters as a Chrome trace-event JSON file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def events(self, tracer):
+        pid = os.getpid()
+        events = [{'name': name, 'cat': category, 'ph': 'X', 'ts': (start - tracer.start) / 1000, 'dur': duration / 1000,
+                   'pid': pid, 'tid': tid, 'args': args}
+                  for name, category, start, duration, tid, args in tracer.spans]
+        end = max([event['ts'] + event['dur'] for event in events] + [0])
+        events.extend({'name': name, 'ph': 'C', 'ts': end, 'pid': pid, 'tid': 0, 'args': {name: value}}
+                      for name, value in sorted(tracer.counters.items()))
+        return events
+
+    def write(self, tracer):
+        with open(self.path, 'w') as file:
+            # span args may hold paths or other objects, they are written as strings
+            json.dump({'traceEvents': self.events(tracer), 'displayTimeUnit': 'ms'}, file, default=str)
+
+
+class SummarySink:
+    """Print a table of the time spent per span name, followed by the counters."""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    @staticmethod
+    def summarize(tracer):
+        """Return span name -> {'category', 'count', 'total_ms', 'max_ms'}, most expensive first."""
+        summary = {}
+        for name, category, _, duration, _, _ in tracer.spans:
+            entry = summary.setdefault(name, {'category': category, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            entry['count'] += 1
+            entry['total_ms'] += duration / 1e6
+            entry['max_ms'] = max(entry['max_ms'], duration / 1e6)
+        return dict(sorted(summary.items(), key=lambda item: item[1]['total_ms'], reverse=True))
+
+    def write(self, tracer):
+        stream = self.stream or sys.stderr
+        print(f"{'span':24} {'category':12} {'count':>8} {'total ms':>12} {'mean ms':>10} {'max ms':>10}", file=stream)
+        for name, entry in self.summarize(tracer).items():
+            print(f"{name:24} {entry['category']:12} {entry['count']:8d} {entry['total_ms']:12.2f} "
+                  f"{entry['total_ms'] / entry['count']:10.3f} {entry['max_ms']:10.3f}", file=stream)
+        for name, value in sorted(tracer.counters.items()):
+            print(f"{name:24} {value}", file=stream)
@@ -0,0 +1,143 @@
+from pyprojectsetup.hlp_footprint import load_distributions
+from pyprojectsetup.hlp_package import get_requirement_name, normalize_package_name, read_requirements
+
+# distributions whose import name cannot be guessed from their name, used when they are not installed
+KNOWN_IMPORT_NAMES = {
+    'pillow': ['PIL'],
+    'scikit-learn': ['sklearn'],
+    'scikit-image': ['skimage'],
+    'pyyaml': ['yaml'],
+    'opencv-python': ['cv2'],
+    'opencv-python-headless': ['cv2'],
+    'opencv-contrib-python': ['cv2'],
+    'beautifulsoup4': ['bs4'],
+    'python-dateutil': ['dateutil'],
+    'python-dotenv': ['dotenv'],
+    'protobuf': ['google'],
+    'pyserial': ['serial'],
+    'pyzmq': ['zmq'],
+    'attrs': ['attr', 'attrs'],
+    'msgpack-python': ['msgpack'],
+    'pyjwt': ['jwt'],
+    'pymupdf': ['fitz'],
+    'typing-extensions': ['typing_extensions'],
+}
+
+# requirements that are used without being imported: plugins, command line tools and build helpers
+DEFAULT_ALLOW_LIST = ['pip', 'setuptools', 'wheel', 'pytest', 'pytest-cov', 'pytest-xdist', 'tox', 'nox', 'coverage',
+                      'black', 'flake8', 'ruff', 'mypy', 'pylint', 'isort', 'pre-commit', 'twine', 'build',
+                      'gunicorn', 'uvicorn', 'ipykernel', 'jupyter', 'sphinx']
+
+
+def get_import_names(distribution_name, distributions, flag_guess=True):
+    """
+    Return the top level import names a distribution provides.
+
+    The installed metadata is used first (top_level.txt, then the files listed in RECORD), then the
+    KNOWN_IMPORT_NAMES table, and finally the distribution name itself with '-' replaced by '_'.
+
+    Args:
+        distribution_name (str): Name of the distribution, as written in requirements.txt.
+        distributions (dict): Installed distributions, as returned by `hlp_footprint.load_distributions`.
+        flag_guess (bool, optional): Fall back on the distribution name when neither the metadata nor
+            KNOWN_IMPORT_NAMES know the distribution. Defaults to True.
+
+    Returns:
+        set of str: The import names, empty if the names are unknown and flag_guess is False.
+    """
+    normalized = normalize_package_name(distribution_name)
+    names = set(KNOWN_IMPORT_NAMES.get(normalized, []))
+    dist = distributions.get(normalized)
+    if dist is not None:
+        top_level = dist.read_text('top_level.txt')
+        if top_level:
+            names.update(line.strip() for line in top_level.splitlines() if line.strip())
+        else:
+            for file in dist.files or []:
+                root = file.parts[0]
+                if root.endswith('.py'):
+                    names.add(root[:-3])
+                elif len(file.parts) > 1 and not root.endswith(('.dist-info', '.data')) and root not in ('..', '__pycache__'):
+                    names.add(root)
+    if not names and flag_guess:
+        names.add(normalized.replace('-', '_'))
+    return names
+
+
+def find_unused_requirements(requirements, imported_packages, allow_list=None, venv_path=None):
+    """
+    Match the requirements against the root packages a project imports.
+
+    Args:
+        requirements (str or list of str): A requirements.txt path or a list of distribution names.
+        imported_packages (list of str): Root packages imported by the project, for example the output of
+            `get_unique_packages_from_filepath`.
+        allow_list (list of str, optional): Requirements never reported as unused, on top of DEFAULT_ALLOW_LIST
+            (plugins, command line tools...).
+        venv_path (str, optional): Virtual environment whose metadata maps the distributions to their import
+            names. Defaults to None (the current environment).
+
+    Returns:
+        tuple: (used requirements, unused requirements, allowed requirements that are not imported, unresolved
+            requirements), each a list of requirement names in the order of `requirements`. A requirement is
+            unresolved when it is not imported under the name guessed from the distribution name and its import names
+            are neither in the installed metadata nor in KNOWN_IMPORT_NAMES (`python-jose` is imported as `jose`):
+            it may be used, it must not be pruned.
+    """
+    if isinstance(requirements, str):
+        requirements = read_requirements(requirements)
+    distributions = load_distributions(venv_path)
+    imported = set(imported_packages)
+    allowed = {normalize_package_name(name) for name in DEFAULT_ALLOW_LIST + (allow_list or [])}
+
+    used_requirements, unused_requirements, allowed_requirements, unresolved_requirements = [], [], [], []
+    for requirement in requirements:
+        import_names = get_import_names(requirement, distributions, flag_guess=False)
+        if (import_names or get_import_names(requirement, {})) & imported:
+            used_requirements.append(requirement)
+        elif normalize_package_name(requirement) in allowed:
+            allowed_requirements.append(requirement)
+        elif not import_names:
+            unresolved_requirements.append(requirement)
+        else:
+            unused_requirements.append(requirement)
+    return used_requirements, unused_requirements, allowed_requirements, unresolved_requirements
+
+
+def prune_requirements_txt(requirements_path, unused_requirements, output_path=None):
+    """
+    Write a requirements file without the unused requirements, comments and options lines are kept.
+
+    Args:
+        requirements_path (str): The requirements.txt file to prune.
+        unused_requirements (list of str): Requirement names to remove (see `find_unused_requirements`).
+        output_path (str, optional): File to write. Defaults to None (requirements_path is overwritten).
+
+    Returns:
+        list of str: The removed lines.
+    """
+    unused = {normalize_package_name(name) for name in unused_requirements}
+    with open(requirements_path, 'r') as file:
+        lines = file.readlines()
+
+    kept, removed = [], []
+    for line in lines:
+        name = get_requirement_name(line)
+        if name is not None and normalize_package_name(name) in unused:
+            removed.append(line.strip())
+        else:
+            kept.append(line)
+
+    with open(output_path or requirements_path, 'w') as file:
+        file.writelines(kept)
+    return removed
+
+
+if __name__ == '__main__':
+    from pyprojectsetup.hlp_package import get_unique_packages_from_filepath
+
+    packages = get_unique_packages_from_filepath('../../', excluded_folders=['venv', 'build'])
+    used, unused, allowed, unresolved = find_unused_requirements('./requirements.txt', packages)
+    print("Requirements never imported :", unused)
+    print("Allowed without import :", allowed)
+    print("Import names unknown, install them to check :", unresolved)
@@ -0,0 +1,359 @@
+"""
+Watch a project and keep its third party packages (and optionally its requirements.txt) in sync incrementally.
+
+Changes are detected with inotify on Linux and with stat polling elsewhere. Only the changed files are parsed again,
+the set of root packages is updated from per-file results, and only the names never seen before are classified.
+Events are debounced: a branch switch touching thousands of files produces a single batched update.
+"""
+import os
+import select
+import struct
+import sys
+import time
+
+from pyprojectsetup import hlp_trace
+from pyprojectsetup.hlp_package import (DEFAULT_EXCLUDE_PACKAGES, DEFAULT_EXCLUDED_FOLDERS, PYPI_URL, analyze_py_files,
+                                        categorize_packages, is_excluded_path, normalize_package_name,
+                                        read_requirements, update_requirements_txt)
+
+SCANNED_EXTENSIONS = ('.py', '.ipynb')  # files whose imports are tracked, notebooks included
+
+
+def _find_scanned_files(folder, root, excluded_folders):
+    """Return the scanned files under folder, excluded folders are not walked."""
+    files = []
+    for current, dirs, filenames in os.walk(folder):
+        dirs[:] = [name for name in dirs
+                   if not is_excluded_path(os.path.join(current, name), excluded_folders, root=root)]
+        files.extend(os.path.join(current, name) for name in filenames if name.endswith(SCANNED_EXTENSIONS)
+                     and not is_excluded_path(os.path.join(current, name), excluded_folders, root=root))
+    return files
+
+
+class IncrementalScanner:
+    """
+    Root packages imported by a project, kept up to date file by file.
+
+    Args:
+        root (str): The project folder.
+        excluded_folders (list of str, optional): Folders skipped, with the `find_files` rule applied to the paths
+            relative to root. Defaults to DEFAULT_EXCLUDED_FOLDERS.
+        additional_exclude_packages (list of str, optional): Packages ignored on top of DEFAULT_EXCLUDE_PACKAGES.
+    """
+
+    def __init__(self, root, excluded_folders=DEFAULT_EXCLUDED_FOLDERS, additional_exclude_packages=None):
+        self.root = os.path.abspath(root)
+        self.excluded_folders = list(excluded_folders)
+        self.exclude_packages = set(DEFAULT_EXCLUDE_PACKAGES + (additional_exclude_packages or []))
+        self.imports = {}  # file path -> set of root packages imported by the file
+        self.counts = {}  # root package -> number of files importing it
+
+    def packages(self):
+        """Return the sorted root packages imported by the project, excluded packages left out."""
+        return sorted(package for package in self.counts if package not in self.exclude_packages)
+
+    def scan_all(self):
+        """Scan the whole project, return the sorted root packages."""
+        self.imports, self.counts = {}, {}
+        self.update([self.root])
+        return self.packages()
+
+    def _roots(self, imported_modules):
+        return {module.split('.')[0] for module in imported_modules if module.split('.')[0].isidentifier()}
+
+    def _set_file(self, path, roots):
+        """Replace the roots of one file, keeping the per package file counts up to date."""
+        old_roots = self.imports.pop(path, set())
+        if roots:
+            self.imports[path] = roots
+        for package in roots - old_roots:
+            self.counts[package] = self.counts.get(package, 0) + 1
+        for package in old_roots - roots:
+            self.counts[package] -= 1
+            if self.counts[package] == 0:
+                del self.counts[package]
+
+    def _tracked_under(self, folder):
+        prefix = folder.rstrip(os.sep) + os.sep
+        return [path for path in self.imports if path.startswith(prefix)]
+
+    def update(self, paths):
+        """
+        Take changed paths (files or folders, created, modified or deleted) into account.
+
+        Args:
+            paths (iterable of str): Paths reported by a watcher.
+
+        Returns:
+            tuple: (sorted packages now imported that were not before, sorted packages no longer imported),
+                excluded packages left out.
+        """
+        targets = set()
+        for path in paths:
+            path = os.path.abspath(path)
+            if os.path.isdir(path):
+                targets.update(self._tracked_under(path))
+                targets.update(_find_scanned_files(path, self.root, self.excluded_folders))
+            else:
+                targets.add(path)
+                if not path.endswith(SCANNED_EXTENSIONS) and not os.path.exists(path):  # a deleted or moved folder
+                    targets.update(self._tracked_under(path))
+
+        to_parse = [path for path in targets
+                    if path.endswith(SCANNED_EXTENSIONS) and os.path.isfile(path)
+                    and not is_excluded_path(path, self.excluded_folders, root=self.root)]
+        results = analyze_py_files(to_parse, flag_full_path=True)
+
+        before = set(self.counts)
+        for path in targets:
+            self._set_file(path, self._roots(results.get(path, [])))
+        after = set(self.counts)
+        hlp_trace.count('files_rescanned', len(to_parse))
+        return sorted(after - before - self.exclude_packages), sorted(before - after - self.exclude_packages)
+
+
+class PollingWatcher:
+    """
+    Detect changed `.py` / `.ipynb` files by comparing (mtime, size) snapshots, excluded folders are not walked at all.
+
+    Args:
+        root (str): The project folder.
+        excluded_folders (list of str, optional): Folders skipped, with the `find_files` rule applied to the paths
+            relative to root. Defaults to DEFAULT_EXCLUDED_FOLDERS.
+        interval (float, optional): Minimum seconds between two walks of the project. Defaults to 1.0.
+    """
+
+    def __init__(self, root, excluded_folders=DEFAULT_EXCLUDED_FOLDERS, interval=1.0):
+        self.root = os.path.abspath(root)
+        self.excluded_folders = list(excluded_folders)
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+        self._last_poll = time.monotonic()
+
+    def _take_snapshot(self):
+        snapshot = {}
+        folders = [self.root]
+        while folders:
+            folder = folders.pop()
+            try:
+                entries = list(os.scandir(folder))
+            except OSError:
+                continue
+            for entry in entries:
+                if is_excluded_path(entry.path, self.excluded_folders, root=self.root):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        folders.append(entry.path)
+                    elif entry.name.endswith(SCANNED_EXTENSIONS):
+                        stat = entry.stat()
+                        snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    continue
+        return snapshot
+
+    def poll(self, timeout):
+        """Wait up to timeout seconds (at least until the polling interval is over), return the changed paths."""
+        time.sleep(max(0.0, min(timeout, self._last_poll + self.interval - time.monotonic())))
+        if time.monotonic() - self._last_poll < self.interval:
+            return set()
+        self._last_poll = time.monotonic()
+        with hlp_trace.span('poll', 'watch'):
+            snapshot = self._take_snapshot()
+        changed = {path for path in snapshot.keys() | self._snapshot.keys() if snapshot.get(path) != self._snapshot.get(path)}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    Detect changes with Linux inotify, one watch per project folder (excluded folders are not watched).
+
+    Args:
+        root (str): The project folder.
+        excluded_folders (list of str, optional): Folders skipped, with the `find_files` rule applied to the paths
+            relative to root. Defaults to DEFAULT_EXCLUDED_FOLDERS.
+
+    Raises:
+        OSError: If inotify is not available.
+    """
+    IN_MODIFY = 0x2
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, root, excluded_folders=DEFAULT_EXCLUDED_FOLDERS):
+        import ctypes
+        import ctypes.util
+
+        self.root = os.path.abspath(root)
+        self.excluded_folders = list(excluded_folders)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._folders = {}  # watch descriptor -> folder
+        self._add_tree(self.root)
+
+    def _add_tree(self, folder):
+        for current, dirs, _ in os.walk(folder):
+            dirs[:] = [name for name in dirs
+                       if not is_excluded_path(os.path.join(current, name), self.excluded_folders, root=self.root)]
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(current), self.WATCH_MASK)
+            if wd >= 0:
+                self._folders[wd] = current
+
+    def poll(self, timeout):
+        """Wait up to timeout seconds for events, return the changed paths (files and folders)."""
+        changed = set()
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        while readable:
+            try:
+                data = os.read(self._fd, 1 << 16)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + self.EVENT_HEADER.size:offset + self.EVENT_HEADER.size + length].rstrip(b'\0'))
+                offset += self.EVENT_HEADER.size + length
+                if mask & self.IN_Q_OVERFLOW:
+                    changed.add(self.root)  # events were lost, rescan everything
+                    continue
+                if mask & self.IN_IGNORED:
+                    self._folders.pop(wd, None)
+                    continue
+                folder = self._folders.get(wd)
+                if folder is None or not name:
+                    continue
+                path = os.path.join(folder, name)
+                if is_excluded_path(path, self.excluded_folders, root=self.root):
+                    continue
+                if mask & self.IN_ISDIR:
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                        self._add_tree(path)
+                    changed.add(path)
+                elif name.endswith(SCANNED_EXTENSIONS):
+                    changed.add(path)
+            readable, _, _ = select.select([self._fd], [], [], 0)
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+def create_watcher(root, excluded_folders=DEFAULT_EXCLUDED_FOLDERS, flag_polling=False, interval=1.0):
+    """Return an `InotifyWatcher` when possible, a `PollingWatcher` otherwise (or when flag_polling is True)."""
+    if not flag_polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root, excluded_folders=excluded_folders)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, excluded_folders=excluded_folders, interval=interval)
+
+
+def watch(watcher, callback, debounce=0.5, stop_event=None):
+    """
+    Call callback with every debounced batch of changed paths until stop_event is set (or KeyboardInterrupt).
+
+    A batch is handed over once no new change arrived for `debounce` seconds.
+    """
+    pending = set()
+    last_change = 0.0
+    try:
+        while stop_event is None or not stop_event.is_set():
+            changed = watcher.poll(debounce)
+            if changed:
+                pending |= changed
+                last_change = time.monotonic()
+            elif pending and time.monotonic() - last_change >= debounce:
+                batch, pending = pending, set()
+                callback(batch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+def _missing_requirements(packages, requirements_path):
+    """Return the packages not listed in requirements_path (all of them if the file does not exist)."""
+    try:
+        listed = {normalize_package_name(name) for name in read_requirements(requirements_path)}
+    except FileNotFoundError:
+        listed = set()
+    return [package for package in packages if normalize_package_name(package) not in listed]
+
+
+def watch_requirements(filepath, requirements_path='requirements.txt', flag_apply=False, excluded_folders=DEFAULT_EXCLUDED_FOLDERS,
+                       additional_exclude_packages=None, debounce=0.5, flag_polling=False, interval=1.0,
+                       index_url=PYPI_URL, on_update=None, stop_event=None):
+    """
+    Watch a project and report (or apply) the requirements.txt changes as the code is edited.
+
+    Args:
+        filepath (str): The project folder.
+        requirements_path (str, optional): The requirements file to keep in sync. Defaults to 'requirements.txt'.
+        flag_apply (bool, optional): Add the new PyPI packages to requirements_path without asking. Defaults to False.
+        excluded_folders (list of str, optional): Folders skipped. Defaults to DEFAULT_EXCLUDED_FOLDERS.
+        additional_exclude_packages (list of str, optional): Packages ignored on top of DEFAULT_EXCLUDE_PACKAGES.
+        debounce (float, optional): Seconds without change before a batch is processed. Defaults to 0.5.
+        flag_polling (bool, optional): Use stat polling even where inotify is available. Defaults to False.
+        interval (float, optional): Seconds between two walks when polling. Defaults to 1.0.
+        index_url (str, optional): Package index JSON API (see `check_pypi`). Defaults to PYPI_URL.
+        on_update (callable, optional): Called with a dict {'added', 'removed', 'pypi', 'local', 'undetermined',
+            'missing'} after every batch that changed the packages. Defaults to printing it.
+        stop_event (threading.Event, optional): Stops watching when set. Defaults to None (runs until Ctrl+C).
+
+    Returns:
+        list of str: The packages imported by the project when watching stopped.
+    """
+    scanner = IncrementalScanner(filepath, excluded_folders=excluded_folders,
+                                 additional_exclude_packages=additional_exclude_packages)
+    watcher = create_watcher(filepath, excluded_folders=excluded_folders, flag_polling=flag_polling, interval=interval)
+    classified = {}  # package -> 'pypi', 'local' or 'undetermined', every name is classified once
+
+    def classify(packages):
+        pypi_packages, localpy_packages, undetermined_packages = categorize_packages(packages, filepath=filepath, index_url=index_url)
+        for category, names in (('pypi', pypi_packages), ('local', localpy_packages), ('undetermined', undetermined_packages)):
+            classified.update((name, category) for name in names)
+
+    def report(update):
+        print(f"New imports: {update['added']}  no longer imported: {update['removed']}")
+        if update['pypi']:
+            print(f"PyPI packages {'added to' if flag_apply else 'missing from'} {requirements_path}: {update['missing']}")
+
+    classify(scanner.scan_all())
+    on_update = on_update or report
+    print(f"Watching {scanner.root} ({type(watcher).__name__}), {len(scanner.packages())} packages imported")
+
+    def on_batch(paths):
+        with hlp_trace.span('update', 'watch', files=len(paths)):
+            added, removed = scanner.update(paths)
+            if not added and not removed:
+                return
+            new_names = [name for name in added if name not in classified]
+            if new_names:
+                classify(new_names)
+            update = {'added': added, 'removed': removed, 'missing': []}
+            for category in ('pypi', 'local', 'undetermined'):
+                update[category] = [name for name in added if classified.get(name) == category]
+            if update['pypi']:
+                # names are compared normalized, 'pandas==2.0' already lists pandas
+                update['missing'] = _missing_requirements(update['pypi'], requirements_path)
+                if flag_apply and update['missing']:
+                    update_requirements_txt(update['missing'], requirements_path, flag_confirm=False)
+            on_update(update)
+
+    watch(watcher, on_batch, debounce=debounce, stop_event=stop_event)
+    return scanner.packages()
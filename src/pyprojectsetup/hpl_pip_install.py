@@ -7,12 +7,12 @@ import logging
 import subprocess
 import importlib
 
-# Ensure the logging is configured; this might be better placed in your main script or a setup function
-logging.basicConfig(level=logging.INFO)
+from pyprojectsetup import hlp_trace
 
 def exec_command(command):
     try:
-        subprocess.run(command, check=True)
+        with hlp_trace.span('subprocess', 'install', command=command):
+            subprocess.run(command, check=True)
         logging.info(f"{command} : successful")
     except subprocess.CalledProcessError as e:
         logging.error(f"Error with: {command} {e}")
@@ -24,6 +24,8 @@ def install_requirements_onepackage_at_a_time(requirements_path):
     Install packages from a requirements.txt file one package at a time.
 
     :param requirements_path: Path to the requirements.txt file
+    :return: (successfully installed packages, packages that failed to install), None if the requirements file
+        could not be read
     """
     # Set up logging
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -45,7 +47,8 @@ def install_requirements_onepackage_at_a_time(requirements_path):
         # Install each package using pip
         for package in packages:
             try:
-                subprocess.check_call([sys.executable, '-m', 'pip', 'install', package])
+                with hlp_trace.span('subprocess', 'install', command=f"pip install {package}"):
+                    subprocess.check_call([sys.executable, '-m', 'pip', 'install', package])
                 successful_installs.append(package)
                 logger.info(f"Successfully installed package: {package}")
             except subprocess.CalledProcessError:
@@ -70,11 +73,13 @@ def install_requirements_onepackage_at_a_time(requirements_path):
                 except ImportError:
                     # If import fails, then the package is genuinely missing
                     logger.error(package)
+        return successful_installs, unsuccessful_installs
 
     except FileNotFoundError as e:
         logger.error(e)
     except Exception as e:
         logger.error(f"An error occurred: {e}")
+    return None
 
 
 
@@ -83,16 +88,20 @@ def install_requirements(requirements_path):
     Install packages from a requirements.txt file using `pip install -r`.
 
     :param requirements_path: Path to the requirements.txt file
+    :return: True if pip succeeded, False otherwise
     """
     try:
         # Execute pip install command
         requirements_path = os.path.abspath(requirements_path)  # Get the absolute path
-        subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-r', requirements_path])
+        with hlp_trace.span('subprocess', 'install', command=f"pip install -r {requirements_path}"):
+            subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-r', requirements_path])
         logging.info(f"Packages from {requirements_path} installed successfully.")
+        return True
     except subprocess.CalledProcessError as e:
         logging.error(f"An error occurred during package installation: {e}")
     except FileNotFoundError:
         logging.error(f"The file {requirements_path} was not found.")
+    return False
 
 
 
@@ -130,7 +139,8 @@ def pip_install(package, *pip_args, flag_verbose=False):
         pip_command.extend(pip_args)
 
         # Execute the pip command
-        result = subprocess.run(pip_command, capture_output=True, text=True)
+        with hlp_trace.span('subprocess', 'install', command=' '.join(pip_command)):
+            result = subprocess.run(pip_command, capture_output=True, text=True)
 
         if result.returncode == 0:
             if flag_verbose:
@@ -285,6 +295,8 @@ def remove_if_empty(directory):
         print(f"The directory '{directory}' does not exist.")
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
     #%% install requirements.txt
     # Example usage
     requirements_path = './requirements.txt'  # Update this path
@@ -2,9 +2,24 @@ import subprocess
 import sys
 import os
 import logging
+import shutil
+import time
+import zipfile
+import configparser
+import contextlib
+import threading
 
-# Setup basic logging
-logging.basicConfig(filename='python_venv_setup.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+try:
+    import fcntl
+except ImportError:  # windows: no shared file locks, old seeds are kept (see _remove_old_seeds)
+    fcntl = None
+
+from pyprojectsetup import hlp_trace
+
+DEFAULT_SEED_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pyprojectsetup', 'seed')
+SEED_PACKAGES = ('pip', 'setuptools', 'wheel')
+SEED_MAX_AGE_DAYS = 30
+_seed_lock = threading.Lock()  # environments of a matrix are seeded from concurrent threads
 
 def list_pythons():
     """List available Python installations with improved exception handling and security considerations."""
@@ -57,14 +72,34 @@ def check_virtual_env(venv_path):
     logging.info(f"Checking if virtual environment exists at {venv_path}: {'Found' if exists else 'Not found'}")
     return exists
 
-def create_virtual_env(python_executable, venv_path="venv"):
-    """Create a virtual environment with progress indication, exception handling, and logging."""
+def create_virtual_env(python_executable, venv_path="venv", flag_seed=False, seed_dir=DEFAULT_SEED_DIR):
+    """
+    Create a virtual environment with progress indication, exception handling, and logging.
+
+    Args:
+        python_executable: interpreter used to create the virtual environment
+        venv_path: folder of the virtual environment
+        flag_seed: if True, the environment is created with `--without-pip` and pip/setuptools/wheel are linked
+            from the seed cache (see `seed_virtual_env`) instead of being installed by ensurepip
+        seed_dir: root folder of the seed cache
+
+    Returns: True if the virtual environment was created, False otherwise
+    """
     try:
         if not os.path.exists(venv_path):
             os.makedirs(venv_path)
             logging.info(f"Created directory for virtual environment: {venv_path}")
         print("Creating virtual environment. This may take a few moments...")
-        result = subprocess.run([python_executable, "-m", "venv", venv_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        command = [python_executable, "-m", "venv", venv_path]
+        if flag_seed:
+            command.append("--without-pip")
+        with hlp_trace.span('subprocess', 'venv', command=' '.join(command)):
+            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if result.returncode == 0 and flag_seed and not seed_virtual_env(venv_path, python_executable, seed_dir=seed_dir):
+            logging.warning(f"Seeding of {venv_path} failed, falling back to ensurepip")
+            with hlp_trace.span('subprocess', 'venv', command="ensurepip"):
+                result = subprocess.run([get_venv_python(venv_path), "-m", "ensurepip", "--default-pip"],
+                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
         if result.returncode == 0:
             print(f"Virtual environment created successfully in {venv_path}")
             logging.info(f"Virtual environment created successfully in {venv_path}")
@@ -78,6 +113,209 @@ def create_virtual_env(python_executable, venv_path="venv"):
         logging.error(f"An error occurred while creating virtual environment: {e}")
         return False
 
+def get_venv_python(venv_path):
+    """Return the path of the python executable inside the virtual environment at venv_path."""
+    if sys.platform == "win32":
+        return os.path.join(venv_path, "Scripts", "python.exe")
+    return os.path.join(venv_path, "bin", "python")
+
+def get_venv_version(venv_path):
+    """Return the 'major.minor' python version of a virtual environment, read from its pyvenv.cfg."""
+    with open(os.path.join(venv_path, "pyvenv.cfg"), "r") as file:
+        for line in file:
+            key, _, value = line.partition("=")
+            if key.strip() in ("version", "version_info"):
+                return ".".join(value.strip().split(".")[:2])
+    return None
+
+def get_venv_site_packages(venv_path, python_version):
+    """Return the site-packages folder of a virtual environment for the given 'major.minor' python version."""
+    if sys.platform == "win32":
+        return os.path.join(venv_path, "Lib", "site-packages")
+    return os.path.join(venv_path, "lib", f"python{python_version}", "site-packages")
+
+def _download_seed_wheels(python_executable, python_version, wheel_dir):
+    """Download the seed wheels for python_version, falling back on the wheels bundled with ensurepip when offline."""
+    command = [sys.executable, "-m", "pip", "download", "--only-binary=:all:", "--python-version", python_version,
+               "--disable-pip-version-check", "--dest", wheel_dir] + list(SEED_PACKAGES)
+    logging.info(f"Executing command: {' '.join(command)}")
+    with hlp_trace.span('subprocess', 'venv', command=' '.join(command)):
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode == 0:
+        return True
+
+    logging.warning(f"Could not download seed wheels, using the ones bundled with ensurepip: {result.stderr}")
+    result = subprocess.run([python_executable, "-c", "import ensurepip, os; print(os.path.join(os.path.dirname(ensurepip.__file__), '_bundled'))"],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    bundled_dir = result.stdout.strip()
+    if result.returncode != 0 or not os.path.isdir(bundled_dir):
+        logging.error(f"No bundled wheels found for {python_executable}: {result.stderr}")
+        return False
+    for wheel in os.listdir(bundled_dir):
+        if wheel.endswith(".whl"):
+            shutil.copy2(os.path.join(bundled_dir, wheel), wheel_dir)
+    return True
+
+def prepare_seed(python_executable, python_version, seed_dir=DEFAULT_SEED_DIR, max_age_days=SEED_MAX_AGE_DAYS):
+    """
+    Return the folder holding the unpacked seed wheels for a python version, refreshing it only when needed.
+
+    The seed is kept under `seed_dir/<major.minor>/` and is rebuilt when it is missing or older than max_age_days.
+    A new seed is unpacked in its own folder and the `current` pointer file is then atomically replaced, so that
+    environments seeded concurrently never see a half written seed. The previous seeds are only removed when no
+    process holds the seed lock of the version (see `_seed_file_lock`), an environment being seeded from one of
+    them, in this process or another, never loses its files.
+
+    Args:
+        python_executable: interpreter the seed is prepared for (used for the offline fallback)
+        python_version: 'major.minor' version of the interpreter
+        seed_dir: root folder of the seed cache
+        max_age_days: age after which the seed wheels are downloaded again
+
+    Returns: path of the folder holding one unpacked folder per wheel, or None if no seed could be prepared
+    """
+    with _seed_lock:
+        return _prepare_seed(python_executable, python_version, seed_dir, max_age_days)
+
+def _prepare_seed(python_executable, python_version, seed_dir, max_age_days):
+    version_dir = os.path.join(seed_dir, python_version)
+    pointer = os.path.join(version_dir, "current")
+    if os.path.isfile(pointer) and time.time() - os.path.getmtime(pointer) < max_age_days * 86400:
+        with open(pointer, "r") as file:
+            current = os.path.join(version_dir, file.read().strip())
+        if os.path.isdir(current):
+            hlp_trace.count('cache_hits')
+            return current
+    hlp_trace.count('cache_misses')
+
+    name = f"seed-{time.time_ns()}-{os.getpid()}"
+    new_seed = os.path.join(version_dir, name)
+    wheel_dir = os.path.join(new_seed, "wheels")
+    os.makedirs(wheel_dir)
+    try:
+        if not _download_seed_wheels(python_executable, python_version, wheel_dir):
+            shutil.rmtree(new_seed, ignore_errors=True)
+            return None
+        for wheel in os.listdir(wheel_dir):
+            with zipfile.ZipFile(os.path.join(wheel_dir, wheel)) as archive:
+                archive.extractall(os.path.join(new_seed, "unpacked", wheel[:-len(".whl")]))
+    except Exception as e:
+        logging.error(f"An error occurred while preparing the seed for python {python_version}: {e}")
+        shutil.rmtree(new_seed, ignore_errors=True)
+        return None
+
+    tmp_pointer = f"{pointer}.{name}"
+    with open(tmp_pointer, "w") as file:
+        file.write(name)
+    os.replace(tmp_pointer, pointer)
+    logging.info(f"Prepared seed for python {python_version} in {new_seed}")
+
+    _remove_old_seeds(version_dir, name)
+    return new_seed
+
+@contextlib.contextmanager
+def _seed_file_lock(version_dir, flag_exclusive=False):
+    """
+    Lock the seed folder of a python version across processes: shared while an environment is seeded from it,
+    exclusive (without waiting) to remove old seeds.
+
+    Yields: True if the lock is held, False if the exclusive lock is busy or file locks are not available
+    """
+    if fcntl is None:
+        yield False
+        return
+    with open(os.path.join(version_dir, ".lock"), "a") as file:  # closing the file releases the lock
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB if flag_exclusive else fcntl.LOCK_SH)
+        except OSError:
+            yield False
+            return
+        yield True
+
+def _remove_old_seeds(version_dir, current_name):
+    """Remove the seeds replaced by current_name, unless an environment is being seeded from the version folder."""
+    with _seed_file_lock(version_dir, flag_exclusive=True) as flag_locked:
+        if not flag_locked:
+            logging.info(f"Old seeds in {version_dir} are in use, they are removed at the next refresh")
+            return
+        for folder in os.listdir(version_dir):  # environments only hold links to their files
+            if folder.startswith("seed-") and folder != current_name and os.path.isdir(os.path.join(version_dir, folder)):
+                shutil.rmtree(os.path.join(version_dir, folder), ignore_errors=True)
+
+def _link_tree(source_dir, destination_dir):
+    """Hard link every file of source_dir into destination_dir, copying when linking is not possible."""
+    for root, dirs, filenames in os.walk(source_dir):
+        target_root = os.path.join(destination_dir, os.path.relpath(root, source_dir))
+        os.makedirs(target_root, exist_ok=True)
+        for filename in filenames:
+            source = os.path.join(root, filename)
+            target = os.path.join(target_root, filename)
+            if os.path.exists(target):
+                os.remove(target)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+
+def _write_console_scripts(dist_info_dir, venv_path):
+    """Write the console scripts declared by an unpacked wheel into the bin folder of a posix virtual environment."""
+    entry_points = os.path.join(dist_info_dir, "entry_points.txt")
+    if sys.platform == "win32" or not os.path.isfile(entry_points):
+        return  # `python -m pip` is always available, the .exe launchers are only generated by an install
+    parser = configparser.ConfigParser(delimiters=("=",))
+    parser.optionxform = str
+    parser.read(entry_points)
+    if not parser.has_section("console_scripts"):
+        return
+    python = os.path.abspath(get_venv_python(venv_path))
+    for script, target in parser.items("console_scripts"):
+        module, _, attribute = target.partition(":")
+        script_path = os.path.join(venv_path, "bin", script)
+        with open(script_path, "w") as file:
+            file.write(f"#!{python}\n"
+                       f"import sys\n"
+                       f"from {module.strip()} import {attribute.split('.')[0].strip()}\n"
+                       f"if __name__ == '__main__':\n"
+                       f"    sys.exit({attribute.strip()}())\n")
+        os.chmod(script_path, 0o755)
+
+def seed_virtual_env(venv_path, python_executable, seed_dir=DEFAULT_SEED_DIR):
+    """
+    Link pip, setuptools and wheel from the seed cache into a virtual environment created with `--without-pip`.
+
+    Args:
+        venv_path: folder of the virtual environment
+        python_executable: interpreter the virtual environment was created with
+        seed_dir: root folder of the seed cache
+
+    Returns: True if the virtual environment was seeded, False otherwise
+    """
+    try:
+        python_version = get_venv_version(venv_path)
+        site_packages = get_venv_site_packages(venv_path, python_version)
+        for _ in range(3):
+            seed = prepare_seed(python_executable, python_version, seed_dir=seed_dir)
+            if seed is None:
+                return False
+            with _seed_file_lock(os.path.dirname(seed)):
+                if not os.path.isdir(seed):
+                    continue  # replaced and removed by another process before the lock was taken
+                unpacked_dir = os.path.join(seed, "unpacked")
+                with hlp_trace.span('seed', 'venv', venv=venv_path):
+                    for wheel in os.listdir(unpacked_dir):
+                        _link_tree(os.path.join(unpacked_dir, wheel), site_packages)
+                break
+        else:
+            return False
+        for folder in os.listdir(site_packages):
+            if folder.endswith(".dist-info"):
+                _write_console_scripts(os.path.join(site_packages, folder), venv_path)
+        logging.info(f"Seeded {venv_path} from {seed}")
+        return True
+    except Exception as e:
+        logging.error(f"An error occurred while seeding virtual environment: {e}")
+        return False
+
 def print_activation_instructions(venv_path):
     """Print instructions for activating the virtual environment."""
     if sys.platform == "win32":
@@ -87,22 +325,6 @@ def print_activation_instructions(venv_path):
     print(f"To activate the virtual environment, run: {activation_command}")
     logging.info(f"Provided activation instructions for virtual environment: {activation_command}")
 
-def setup_python_virtual_env(venv_path="venv"):
-    """Setup Python virtual environment with enhanced logging and user feedback."""
-    logging.info("Starting setup of Python virtual environment.")
-    if check_virtual_env(venv_path):
-        print(f"Virtual environment already exists at '{venv_path}'.")
-    else:
-        pythons = list_pythons()
-        selected_python = prompt_installation(pythons)
-        if selected_python:
-            print(f"Creating virtual environment using {selected_python} at '{venv_path}'...")
-            if create_virtual_env(selected_python, venv_path):
-                print("Virtual environment created successfully.")
-                print_activation_instructions(venv_path)
-                logging.info(f"Virtual environment setup completed successfully using {selected_python}.")
-                print('\n You might want to select venv as your virtual environment in pycharm in interpreter settings for your current python project ')
-
 def setup_python_virtual_env(venv_path="./venv"):
     """Setup Python virtual environment with enhanced logging, user feedback, and an option for manual installation."""
     logging.info("Checking for existing Python virtual environment.")
@@ -129,4 +351,5 @@ def setup_python_virtual_env(venv_path="./venv"):
             logging.info("Invalid user input for virtual environment setup option.")
 
 if __name__ == "__main__":
+    logging.basicConfig(filename='python_venv_setup.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     setup_python_virtual_env()
@@ -0,0 +1,215 @@
+"""
+Create a matrix of virtual environments (interpreter versions x requirement sets) non-interactively.
+
+`add_matrix_arguments` is used by the parser of the `pyprojectsetup` command, so that this module is imported on every
+run of the command: the modules needed to provision the environments are imported when they run.
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from pyprojectsetup import hlp_trace
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pyprojectsetup', 'pip')
+
+
+def resolve_python(python):
+    """
+    Resolve an interpreter specification into an executable path.
+
+    Args:
+        python (str): Either a path to an interpreter, an executable name ('python3.11') or a bare version ('3.11').
+
+    Returns:
+        str or None: The path of the matching interpreter, or None if it could not be found.
+    """
+    if os.path.isfile(python):
+        return python
+    if python[0].isdigit():
+        python = f"python{python}"
+    return shutil.which(python)
+
+
+def build_venv_matrix(pythons, requirement_sets, base_dir='.venvs'):
+    """
+    Build the cartesian product of interpreter versions and requirement sets.
+
+    Args:
+        pythons (list of str): Interpreter specifications (see `resolve_python`), ex : ['3.9', '3.11'].
+        requirement_sets (dict): Mapping of a set name to a list of requirement files or package specifiers,
+            ex : {'base': ['requirements.txt'], 'dev': ['requirements.txt', 'pytest']}.
+        base_dir (str, optional): Folder under which every virtual environment is created. Defaults to '.venvs'.
+
+    Returns:
+        list of dict: One entry per environment with the keys 'name', 'python', 'venv_path' and 'requirements'.
+            An interpreter given twice gets its environments once.
+
+    Raises:
+        ValueError: If two different interpreters get the same environment name, ex : two paths ending with
+            'python3.11', their environments would share a folder.
+    """
+    if not requirement_sets:
+        requirement_sets = {'bare': []}
+    matrix = []
+    labels = {}
+    for python in pythons:
+        label = os.path.basename(python) if os.path.isfile(python) else python
+        if not label.startswith('python'):
+            label = f"py{label}"
+        key = os.path.realpath(python) if os.path.isfile(python) else python
+        if label in labels:
+            if labels[label] == key:
+                continue
+            raise ValueError(f"Interpreters {labels[label]} and {key} would share the environments named {label}-*")
+        labels[label] = key
+        for set_name, requirements in requirement_sets.items():
+            name = f"{label}-{set_name}"
+            matrix.append({'name': name,
+                           'python': python,
+                           'venv_path': os.path.join(base_dir, name),
+                           'requirements': list(requirements)})
+    return matrix
+
+
+def _requirements_to_pip_args(requirements):
+    """Turn a list of requirement files (*.txt) or package specifiers into `pip install` arguments."""
+    pip_args = []
+    for requirement in requirements:
+        if requirement.endswith('.txt'):  # a missing file is reported by pip as such, not looked up as a package
+            pip_args.extend(['-r', os.path.abspath(requirement)])
+        else:
+            pip_args.append(requirement)
+    return pip_args
+
+
+def provision_venv(entry, cache_dir=DEFAULT_CACHE_DIR, flag_seed=False):
+    """
+    Create one virtual environment and install its requirements, without any user interaction.
+
+    Args:
+        entry (dict): A matrix entry as returned by `build_venv_matrix`.
+        cache_dir (str, optional): pip cache folder shared by every environment. Defaults to DEFAULT_CACHE_DIR.
+        flag_seed (bool, optional): Link pip/setuptools/wheel from the seed cache instead of running ensurepip.
+            Defaults to False.
+
+    Returns:
+        dict: The matrix entry completed with 'python_executable', 'created', 'installed', 'returncode',
+            'duration' (seconds) and 'error' (None on success).
+    """
+    import logging
+    from pyprojectsetup.hpl_venv_install import create_virtual_env, get_venv_python
+
+    start = time.perf_counter()
+    result = dict(entry, python_executable=None, created=False, installed=False, returncode=None, error=None)
+
+    python_executable = resolve_python(entry['python'])
+    if python_executable is None:
+        result['error'] = f"Python interpreter not found: {entry['python']}"
+        logging.error(result['error'])
+    elif not create_virtual_env(python_executable, entry['venv_path'], flag_seed=flag_seed):
+        result['python_executable'] = python_executable
+        result['error'] = f"Failed to create virtual environment at {entry['venv_path']}"
+    else:
+        result['python_executable'] = python_executable
+        result['created'] = True
+        pip_args = _requirements_to_pip_args(entry.get('requirements', []))
+        if not pip_args:
+            result['installed'] = True
+        else:
+            env = dict(os.environ, PIP_CACHE_DIR=cache_dir, PIP_DISABLE_PIP_VERSION_CHECK='1')
+            command = [get_venv_python(entry['venv_path']), '-m', 'pip', 'install'] + pip_args
+            logging.info(f"{entry['name']}: {' '.join(command)}")
+            try:
+                with hlp_trace.span('subprocess', 'install', command=' '.join(command)):
+                    completed = subprocess.run(command, capture_output=True, text=True, env=env)
+                result['returncode'] = completed.returncode
+                result['installed'] = completed.returncode == 0
+                if completed.returncode != 0:
+                    result['error'] = completed.stderr.strip()
+                    logging.error(f"{entry['name']}: installation failed: {result['error']}")
+            except Exception as e:
+                result['error'] = str(e)
+                logging.error(f"{entry['name']}: an error occurred during installation: {e}")
+
+    result['duration'] = time.perf_counter() - start
+    return result
+
+
+def provision_venv_matrix(matrix, max_workers=2, cache_dir=DEFAULT_CACHE_DIR, flag_seed=False):
+    """
+    Create the virtual environments of a matrix and install their requirements concurrently.
+
+    Args:
+        matrix (list of dict): Entries as returned by `build_venv_matrix`.
+        max_workers (int, optional): Maximum number of environments provisioned at the same time. Defaults to 2.
+        cache_dir (str, optional): pip cache folder shared by every environment, so that a package downloaded
+            or built for one environment is reused by the others. Defaults to DEFAULT_CACHE_DIR.
+        flag_seed (bool, optional): Seed the environments from the seed cache (see `seed_virtual_env`). Defaults to False.
+
+    Returns:
+        list of dict: One result per entry, in the order of `matrix` (see `provision_venv`).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda entry: provision_venv(entry, cache_dir=cache_dir, flag_seed=flag_seed), matrix))
+
+
+def add_matrix_arguments(parser):
+    """Add the venv matrix options to an argparse parser (used by `pyprojectsetup venv` and `main`)."""
+    parser.add_argument('--python', action='append', required=True,
+                        help="interpreter version or path, can be repeated (ex : --python 3.9 --python 3.11)")
+    parser.add_argument('--requirements', action='append', default=[], metavar='NAME=REQ[,REQ...]',
+                        help="named requirement set, can be repeated (ex : --requirements base=requirements.txt)")
+    parser.add_argument('--base-dir', default='.venvs', help="folder where the environments are created")
+    parser.add_argument('--jobs', type=int, default=2, help="number of environments provisioned concurrently")
+    parser.add_argument('--cache-dir', help="pip cache shared by all environments (default: ~/.cache/pyprojectsetup/pip)")
+    parser.add_argument('--seed', action='store_true', help="link pip/setuptools/wheel from a local cache instead of running ensurepip")
+
+
+def run_matrix(args):
+    """
+    Provision the matrix described by parsed `add_matrix_arguments` options and return the results.
+
+    Raises:
+        ValueError: If a requirement set is not written NAME=REQ[,REQ...], if a requirements file (*.txt) does not
+            exist, or if two interpreters would share environments (see `build_venv_matrix`).
+    """
+    requirement_sets = {}
+    for item in args.requirements:
+        name, separator, requirements = item.partition('=')
+        if not separator or not name:
+            raise ValueError(f"Invalid requirement set {item!r}, expected NAME=REQ[,REQ...] (ex : base={item})")
+        requirement_sets[name] = [req for req in requirements.split(',') if req]
+        for requirement in requirement_sets[name]:
+            if requirement.endswith('.txt') and not os.path.isfile(requirement):
+                raise ValueError(f"Requirements file not found: {requirement}")
+
+    matrix = build_venv_matrix(args.python, requirement_sets, base_dir=args.base_dir)
+    return provision_venv_matrix(matrix, max_workers=args.jobs, cache_dir=args.cache_dir or DEFAULT_CACHE_DIR,
+                                 flag_seed=args.seed)
+
+
+def main(argv=None):
+    """Command line entry point, prints one JSON result per environment and returns the exit code."""
+    parser = argparse.ArgumentParser(description="Create a matrix of virtual environments non-interactively.")
+    add_matrix_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with contextlib.redirect_stdout(sys.stderr):  # keep stdout for the JSON report
+        try:
+            results = run_matrix(args)
+        except ValueError as e:
+            parser.error(str(e))
+    print(json.dumps(results, indent=2))
+    return 0 if all(result['error'] is None for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import unittest
+import contextlib
+import io
+import os
+import tempfile
+
+from benchmarks.stub_index import StubIndex
+from benchmarks.synthetic_repo import generate_project
+from pyprojectsetup.hlp_package import check_pypi, find_files, get_unique_packages_from_filepath
+
+
+class TestSyntheticRepo(unittest.TestCase):
+    def test_generate_project(self):
+        with tempfile.TemporaryDirectory() as root:
+            project = generate_project(root, files=20, depth=2, branching=2, lines=10, imports=3, packages=5, decoy_files=4)
+
+            self.assertEqual(len(find_files(root, '*.py', excluded_folders=['venv'])), 20)
+            self.assertEqual(len(find_files(os.path.join(root, 'venv'), '*.py')), 4)
+            with contextlib.redirect_stdout(io.StringIO()):
+                packages = get_unique_packages_from_filepath(root, excluded_folders=['venv'])
+            self.assertTrue(set(project['third_party']) <= set(packages))
+            self.assertFalse(any(package.startswith('decoy') for package in packages))
+
+    def test_same_seed_same_project(self):
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            self.assertEqual(generate_project(first, files=5, seed=3, decoy_files=0)['bytes'],
+                             generate_project(second, files=5, seed=3, decoy_files=0)['bytes'])
+
+
+class TestStubIndex(unittest.TestCase):
+    def test_known_and_unknown_packages(self):
+        with StubIndex(['numpy']) as index:
+            self.assertEqual(check_pypi('numpy', index_url=index.url), ('numpy', True))
+            self.assertEqual(check_pypi('homemade', index_url=index.url), ('homemade', False))
+            self.assertEqual(index.requests, 2)
+
+    def test_error_rate(self):
+        with StubIndex(['numpy'], error_rate=1.0) as index:
+            self.assertEqual(check_pypi('numpy', index_url=index.url), ('numpy', False))
+            self.assertEqual(index.errors, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
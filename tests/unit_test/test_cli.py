@@ -0,0 +1,174 @@
+import unittest
+from unittest.mock import patch
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from pyprojectsetup.cli import main
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, 'main.py'), 'w') as file:
+            file.write("import os\nimport numpy as np\nfrom pandas import DataFrame\nimport helpers\n")
+        with open(os.path.join(self.tmp.name, 'helpers.py'), 'w') as file:
+            file.write("import sys\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_main(self, argv):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(io.StringIO()):
+            exit_code = main(argv)
+        return exit_code, stdout.getvalue()
+
+    def test_scan_json(self):
+        exit_code, output = self.run_main(['--json', 'scan', self.tmp.name])
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(json.loads(output), {'packages': ['helpers', 'numpy', 'pandas'], 'pip_installed': []})
+
+    def test_scan_under_excluded_folder_name(self):
+        project = os.path.join(self.tmp.name, 'myvenvtools', 'proj')  # exclusions apply inside the project only
+        os.makedirs(os.path.join(project, 'venv'))
+        with open(os.path.join(project, 'app.py'), 'w') as file:
+            file.write("import requests\n")
+        with open(os.path.join(project, 'venv', 'decoy.py'), 'w') as file:
+            file.write("import decoy\n")
+        exit_code, output = self.run_main(['--json', 'scan', project])
+        self.assertEqual(json.loads(output)['packages'], ['requests'])
+
+    @patch('pyprojectsetup.hlp_package.check_pypi', side_effect=lambda name, index_url: (name, name != 'helpers'))
+    def test_classify_json(self, mock_check_pypi):
+        exit_code, output = self.run_main(['--json', 'classify', self.tmp.name])
+        self.assertEqual(json.loads(output), {'pypi': ['numpy', 'pandas'], 'local': ['helpers'], 'undetermined': [],
+                                              'pip_installed': []})
+
+    @patch('pyprojectsetup.hlp_package.check_pypi', side_effect=lambda name, index_url: (name, True))
+    def test_sync_without_prompt(self, mock_check_pypi):
+        requirements_path = os.path.join(self.tmp.name, 'requirements.txt')
+        with open(requirements_path, 'w') as file:
+            file.write("numpy\n")
+
+        exit_code, output = self.run_main(['--json', 'sync', self.tmp.name, '--requirements', requirements_path, '--yes'])
+
+        self.assertEqual(json.loads(output)['missing'], ['pandas'])
+        with open(requirements_path, 'r') as file:
+            self.assertEqual(file.read().split(), ['numpy', 'pandas'])
+
+    @patch('pyprojectsetup.hlp_package.check_pypi', side_effect=lambda name, index_url: (name, name != 'helpers'))
+    def test_sync_notebook_pip_installs(self, mock_check_pypi):
+        notebook = {'cells': [{'cell_type': 'code', 'metadata': {}, 'outputs': [],
+                               'source': ["%pip install scikit-learn Scikit_Learn\n", "import sklearn\n"]}]}
+        with open(os.path.join(self.tmp.name, 'analysis.ipynb'), 'w') as file:
+            json.dump(notebook, file)
+        requirements_path = os.path.join(self.tmp.name, 'requirements.txt')
+        with open(requirements_path, 'w') as file:
+            file.write("numpy\npandas\nsklearn\n")
+
+        exit_code, output = self.run_main(['--json', 'scan', self.tmp.name])
+        self.assertEqual(json.loads(output)['pip_installed'], ['scikit-learn'])
+        exit_code, output = self.run_main(['--json', 'sync', self.tmp.name, '--requirements', requirements_path, '--yes'])
+        self.assertEqual(json.loads(output)['missing'], ['scikit-learn'])  # the distribution name, not 'sklearn'
+
+    @patch('pyprojectsetup.hlp_package.check_pypi', side_effect=lambda name, index_url: (name, True))
+    def test_sync_pinned_requirement(self, mock_check_pypi):
+        requirements_path = os.path.join(self.tmp.name, 'requirements.txt')
+        with open(requirements_path, 'w') as file:
+            file.write("NumPy==1.2\n")
+
+        exit_code, output = self.run_main(['--json', 'sync', self.tmp.name, '--requirements', requirements_path, '--yes'])
+
+        self.assertEqual(json.loads(output)['missing'], ['pandas'])
+        with open(requirements_path, 'r') as file:
+            self.assertEqual(file.read(), "NumPy==1.2\npandas\n")
+
+    @patch('pyprojectsetup.hlp_package.check_pypi', side_effect=lambda name, index_url: (name, True))
+    def test_sync_without_trailing_newline(self, mock_check_pypi):
+        requirements_path = os.path.join(self.tmp.name, 'requirements.txt')
+        with open(requirements_path, 'w') as file:
+            file.write("numpy")
+
+        exit_code, output = self.run_main(['--json', 'sync', self.tmp.name, '--requirements', requirements_path, '--yes'])
+
+        self.assertEqual(exit_code, 0)
+        with open(requirements_path, 'r') as file:
+            self.assertEqual(file.read(), "numpy\npandas\n")
+
+    @patch('pyprojectsetup.hlp_package.check_pypi', side_effect=lambda name, index_url: (name, True))
+    def test_sync_missing_requirements_file(self, mock_check_pypi):
+        requirements_path = os.path.join(self.tmp.name, 'missing.txt')
+        exit_code, output = self.run_main(['--json', 'sync', self.tmp.name, '--requirements', requirements_path, '--yes'])
+        self.assertEqual(exit_code, 1)
+        self.assertIn('error', json.loads(output))
+
+    @patch('subprocess.check_call', side_effect=subprocess.CalledProcessError(1, 'pip'))
+    def test_install_failure(self, mock_check_call):
+        requirements_path = os.path.join(self.tmp.name, 'requirements.txt')
+        with open(requirements_path, 'w') as file:
+            file.write("numpy\npandas\n")
+        exit_code, output = self.run_main(['--json', 'install', requirements_path])
+        self.assertEqual((exit_code, json.loads(output)['error']), (1, "pip install failed"))
+        exit_code, output = self.run_main(['--json', 'install', '--one-at-a-time', requirements_path])
+        self.assertEqual((exit_code, json.loads(output)['failed']), (1, ['numpy', 'pandas']))
+
+    def test_venv_interpreters_sharing_a_name(self):
+        pythons = [os.path.join(self.tmp.name, folder, 'python3.11') for folder in ('a', 'b')]
+        for python in pythons:
+            os.makedirs(os.path.dirname(python))
+            open(python, 'w').close()
+        exit_code, output = self.run_main(['--json', 'venv', '--python', pythons[0], '--python', pythons[1]])
+        self.assertEqual(exit_code, 1)
+        self.assertIn('python3.11', json.loads(output)['error'])
+
+    def test_unused_missing_requirements_file(self):
+        requirements_path = os.path.join(self.tmp.name, 'requirements.txt')
+        exit_code, output = self.run_main(['--json', 'unused', self.tmp.name, '--requirements', requirements_path])
+        self.assertEqual(exit_code, 1)
+        self.assertEqual(json.loads(output)['error'], f"Could not read {requirements_path}")
+
+    def test_footprint_missing_requirements_file(self):
+        requirements_path = os.path.join(self.tmp.name, 'missing.txt')
+        exit_code, output = self.run_main(['--json', 'footprint', requirements_path])
+        self.assertEqual(exit_code, 1)
+        self.assertEqual(json.loads(output)['error'], f"Could not read {requirements_path}")
+        exit_code, output = self.run_main(['footprint', requirements_path])
+        self.assertEqual(exit_code, 1)
+        self.assertIn("Could not read", output)
+
+    def test_venv_invalid_requirements(self):
+        requirements_path = os.path.join(self.tmp.name, 'requirements.txt')
+        exit_code, output = self.run_main(['--json', 'venv', '--python', '3.11', '--requirements', requirements_path])
+        self.assertEqual(exit_code, 1)
+        self.assertIn('NAME=REQ', json.loads(output)['error'])
+        exit_code, output = self.run_main(['--json', 'venv', '--python', '3.11', '--requirements', f"base={requirements_path}"])
+        self.assertEqual((exit_code, json.loads(output)['error']), (1, f"Requirements file not found: {requirements_path}"))
+
+    def test_history_unknown_revision(self):
+        for args in (['init', '-q'], ['-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '-q',
+                                      '--allow-empty', '-m', 'init']):
+            subprocess.run(['git', '-C', self.tmp.name] + args, check=True)
+        exit_code, output = self.run_main(['--json', 'history', self.tmp.name, '--revision', 'nosuch'])
+        self.assertEqual(exit_code, 1)
+        self.assertIn('nosuch', json.loads(output)['error'])
+
+    def test_history_outside_a_repository(self):
+        exit_code, output = self.run_main(['history', self.tmp.name])
+        self.assertEqual(exit_code, 1)
+        self.assertIn('error', output)
+
+    def test_scan_has_no_heavy_imports(self):
+        code = ("import sys; from pyprojectsetup.cli import main; main(['scan', sys.argv[1]]); "
+                "print([name for name in ('requests', 'concurrent.futures', 'logging') if name in sys.modules], file=sys.stderr)")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        result = subprocess.run([sys.executable, '-c', code, self.tmp.name], capture_output=True, text=True, env=env)
+        self.assertEqual(result.stderr.strip().splitlines()[-1], '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import os
+import tempfile
+
+from pyprojectsetup.hlp_footprint import footprint_report
+from pyprojectsetup.hlp_package import get_requirement_name
+from pyprojectsetup.hpl_venv_install import get_venv_site_packages
+
+
+def make_distribution(site_packages, name, size, requires=()):
+    dist_info = os.path.join(site_packages, f"{name}-1.0.dist-info")
+    os.makedirs(dist_info)
+    with open(os.path.join(dist_info, "METADATA"), "w") as file:
+        file.write(f"Metadata-Version: 2.1\nName: {name}\nVersion: 1.0\n")
+        for requirement in requires:
+            file.write(f"Requires-Dist: {requirement}\n")
+    with open(os.path.join(dist_info, "RECORD"), "w") as file:
+        file.write(f"{name}/__init__.py,sha256=x,{size}\n{name}-1.0.dist-info/RECORD,,\n")
+    return os.path.getsize(os.path.join(dist_info, "RECORD"))  # measured on disk, RECORD has no size for itself
+
+
+class TestFootprintReport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.venv_path = self.tmp.name
+        with open(os.path.join(self.venv_path, "pyvenv.cfg"), "w") as file:
+            file.write("version = 3.11.7\n")
+        site_packages = get_venv_site_packages(self.venv_path, "3.11")
+        self.big = 1000 + make_distribution(site_packages, "big_app", 1000, requires=["shared-lib>=1.0", "docs-only ; extra == 'docs'"])
+        self.small = 100 + make_distribution(site_packages, "small-app", 100, requires=["shared_lib", "broken >= = 1"])
+        self.shared = 600 + make_distribution(site_packages, "shared-lib", 600)
+        make_distribution(site_packages, "docs-only", 5000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_shared_dependencies_are_split(self):
+        report = footprint_report(["small-app", "Big.App", "not-installed"], venv_path=self.venv_path)
+        by_name = {entry['requirement']: entry for entry in report}
+
+        self.assertEqual([entry['requirement'] for entry in report], ["Big.App", "small-app", "not-installed"])
+        self.assertEqual(by_name["Big.App"]['closure'], ["big-app", "shared-lib"])
+        self.assertEqual(by_name["Big.App"]['bytes'], self.big + self.shared)
+        self.assertEqual(by_name["Big.App"]['exclusive_bytes'], self.big)
+        self.assertEqual(by_name["Big.App"]['attributed_bytes'], self.big + self.shared / 2)
+        self.assertEqual(by_name["small-app"]['attributed_bytes'], self.small + self.shared / 2)
+        self.assertEqual(by_name["small-app"]['files'], 4)
+        self.assertEqual(by_name["small-app"]['closure'], ["shared-lib", "small-app"])
+        self.assertEqual(by_name["not-installed"]['missing'], ["not-installed"])
+
+    def test_requirements_file(self):
+        requirements_path = os.path.join(self.tmp.name, "requirements.txt")
+        with open(requirements_path, "w") as file:
+            file.write("# app\nbig_app==1.0\n-r other.txt\n")
+        self.assertEqual([entry['requirement'] for entry in footprint_report(requirements_path, venv_path=self.venv_path)], ["big_app"])
+
+
+class TestRequirementName(unittest.TestCase):
+    def test_get_requirement_name(self):
+        self.assertEqual(get_requirement_name('requests[socks]>=2.0 ; python_version > "3.7"'), 'requests')
+        self.assertEqual(get_requirement_name('pkg @ https://example.com/pkg.whl'), 'pkg')
+        self.assertIsNone(get_requirement_name('git+https://example.com/repo.git'))
+        self.assertIsNone(get_requirement_name('-e .'))
+        self.assertIsNone(get_requirement_name('   # comment'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import os
+import shutil
+import subprocess
+import tempfile
+
+from pyprojectsetup import hlp_trace
+from pyprojectsetup.hlp_git_history import GitObjectReader, RevisionScanner, list_tags, parse_tree, scan_revisions
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(content)
+
+
+def git(repo, *args):
+    env = dict(os.environ, GIT_AUTHOR_NAME='test', GIT_AUTHOR_EMAIL='test@example.org',
+               GIT_COMMITTER_NAME='test', GIT_COMMITTER_EMAIL='test@example.org')
+    return subprocess.run(['git', '-C', repo] + list(args), check=True, capture_output=True, text=True, env=env).stdout
+
+
+@unittest.skipIf(shutil.which('git') is None, "git is not installed")
+class TestRevisionScanner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.repo = self.tmp.name
+        git(self.repo, 'init', '-q')
+        write(os.path.join(self.repo, 'a.py'), "import numpy\nimport os\n")
+        write(os.path.join(self.repo, 'pkg', 'b.py'), "from pandas import DataFrame\n")
+        write(os.path.join(self.repo, 'venv', 'c.py'), "import decoy\n")
+        write(os.path.join(self.repo, 'notes.txt'), "import not_python\n")
+        git(self.repo, 'add', '-A')
+        git(self.repo, 'commit', '-q', '-m', 'first')
+        git(self.repo, 'tag', 'v1.0')
+        write(os.path.join(self.repo, 'a.py'), "import numpy\nimport requests\n")
+        write(os.path.join(self.repo, 'broken.py'), "def broken(:\n")
+        git(self.repo, 'add', '-A')
+        git(self.repo, 'commit', '-q', '-m', 'second')
+        git(self.repo, 'tag', 'v2.0')
+        git(self.repo, 'rm', '-q', '-r', 'pkg')
+        git(self.repo, 'commit', '-q', '-m', 'third')
+        write(os.path.join(self.repo, 'a.py'), "import uncommitted\n")  # the working tree is never read
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scan_revisions(self):
+        history = scan_revisions(self.repo, list_tags(self.repo) + ['HEAD'])
+        self.assertEqual([entry['revision'] for entry in history], ['v1.0', 'v2.0', 'HEAD'])
+        self.assertEqual(history[0]['packages'], ['numpy', 'pandas'])
+        self.assertEqual((history[1]['added'], history[1]['removed']), (['requests'], []))
+        self.assertEqual((history[2]['packages'], history[2]['removed']), (['numpy', 'requests'], ['pandas']))
+        self.assertEqual(history[2]['commit'], git(self.repo, 'rev-parse', 'HEAD').strip())
+
+    def test_unchanged_files_are_parsed_once(self):
+        tracer = hlp_trace.enable()
+        try:
+            with RevisionScanner(self.repo) as scanner:
+                for revision in ['v1.0', 'v2.0', 'HEAD', 'v1.0']:
+                    scanner.scan(revision)
+        finally:
+            hlp_trace.disable()
+        # v1.0: a.py, pkg/b.py - v2.0: new a.py, broken.py - HEAD: nothing new
+        self.assertEqual(tracer.counters['files_scanned'], 4)
+
+    def test_unknown_revision(self):
+        with RevisionScanner(self.repo) as scanner:
+            with self.assertRaises(ValueError):
+                scanner.scan('no-such-tag')
+            self.assertEqual(scanner.scan('v1.0')[1], ['numpy', 'pandas'])  # the process is still usable
+
+    def test_parse_tree(self):
+        with GitObjectReader(self.repo) as reader:
+            sha, kind, content = reader.read('v1.0^{tree}')
+        self.assertEqual(kind, 'tree')
+        self.assertEqual([(mode, name) for mode, name, _ in parse_tree(content, len(sha) // 2)],
+                         [(b'100644', 'a.py'), (b'100644', 'notes.txt'), (b'40000', 'pkg'), (b'40000', 'venv')])
+
+
+if __name__ == '__main__':
+    unittest.main()
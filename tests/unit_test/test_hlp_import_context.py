@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import patch
+import os
+import tempfile
+
+from pyprojectsetup.hlp_import_context import (classify_imports, get_package_contexts, get_requirement_groups_from_filepath,
+                                               group_packages, is_test_file, write_requirement_groups)
+
+SOURCE = """
+import numpy
+from typing import TYPE_CHECKING
+from . import sibling
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+else:
+    import orjson
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+else:
+    import attrs
+
+def load():
+    import yaml
+    try:
+        from rich import print
+    except (ModuleNotFoundError, AttributeError):
+        pass
+    if typing.TYPE_CHECKING:
+        import mypy_extensions
+
+class Model:
+    import pydantic
+    handler = lambda: __import__('ignored')
+"""
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(content)
+
+
+class TestClassifyImports(unittest.TestCase):
+    def test_contexts(self):
+        self.assertEqual(classify_imports(SOURCE),
+                         [('numpy', 'hard'), ('typing.TYPE_CHECKING', 'hard'),
+                          ('ujson', 'optional'), ('json', 'optional'), ('orjson', 'optional'),
+                          ('pandas.DataFrame', 'type_checking'), ('attrs', 'hard'),
+                          ('yaml', 'lazy'), ('rich.print', 'optional'), ('mypy_extensions', 'type_checking'),
+                          ('pydantic', 'hard')])
+
+    def test_unguarded_try(self):
+        source = "try:\n    import numpy\nexcept KeyError:\n    pass\nfinally:\n    import pandas\n"
+        self.assertEqual(classify_imports(source), [('numpy', 'hard'), ('pandas', 'hard')])
+        source = "try:\n    import numpy\nexcept Exception:\n    pass\ntry:\n    import scipy\nexcept:\n    pass\n"
+        self.assertEqual(classify_imports(source), [('numpy', 'hard'), ('scipy', 'hard')])
+
+    def test_test_file(self):
+        self.assertEqual(classify_imports("import pytest\ndef f():\n    import numpy\n", flag_test=True),
+                         [('pytest', 'test'), ('numpy', 'test')])
+
+    def test_is_test_file(self):
+        self.assertTrue(is_test_file(os.path.join('tests', 'unit', 'helpers.py')))
+        self.assertTrue(is_test_file(os.path.join('pkg', 'test_model.py')))
+        self.assertTrue(is_test_file('conftest.py'))
+        self.assertFalse(is_test_file(os.path.join('pkg', 'testing_tools.py')))
+
+
+class TestGroups(unittest.TestCase):
+    def test_strongest_group_wins(self):
+        package_contexts = get_package_contexts({'a.py': [('numpy.linalg', 'lazy'), ('yaml', 'optional')],
+                                                 'b.py': [('numpy', 'hard'), ('mypy', 'type_checking')],
+                                                 'tests/test_a.py': [('pytest', 'test'), ('yaml', 'test')]})
+        self.assertEqual(package_contexts['numpy'], ['hard', 'lazy'])
+        self.assertEqual(group_packages(package_contexts),
+                         {'core': ['numpy'], 'optional': ['yaml'], 'dev': ['mypy', 'pytest']})
+        self.assertEqual(group_packages({'yaml': ['lazy'], 'rich': ['optional']}),
+                         {'core': ['yaml'], 'optional': ['rich'], 'dev': []})
+
+    def test_from_filepath(self):
+        with tempfile.TemporaryDirectory() as folder:
+            root = os.path.join(folder, 'test', 'project')  # a project stored under a 'test' folder
+            write(os.path.join(root, 'app.py'), "import os\nimport flask\ndef run():\n    import gunicorn\n")
+            write(os.path.join(root, 'tests', 'test_app.py'), "import pytest\nimport flask\n")
+            write(os.path.join(root, 'venv', 'lib.py'), "import decoy\n")
+            self.assertEqual(get_requirement_groups_from_filepath(root),
+                             {'core': ['flask', 'gunicorn'], 'optional': [], 'dev': ['pytest']})
+
+    @patch('pyprojectsetup.hlp_package.check_pypi', side_effect=lambda name, index_url: (name, name != 'helpers'))
+    def test_write_groups(self, mock_check_pypi):
+        with tempfile.TemporaryDirectory() as folder:
+            write(os.path.join(folder, 'requirements.txt'), "flask==2.0\nnumpy")
+            added = write_requirement_groups({'core': ['flask', 'helpers', 'numpy', 'yaml'], 'optional': ['gunicorn'],
+                                              'dev': ['pytest']}, output_dir=folder, filepath=folder)
+            self.assertEqual(added, {'core': ['yaml'], 'optional': ['gunicorn'], 'dev': ['pytest']})
+            with open(os.path.join(folder, 'requirements.txt')) as file:
+                self.assertEqual(file.read(), "flask==2.0\nnumpy\nyaml\n")
+            with open(os.path.join(folder, 'requirements-dev.txt')) as file:
+                self.assertEqual(file.read().split(), ['pytest'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+from unittest.mock import patch
+import json
+import os
+import sys
+import tempfile
+
+from pyprojectsetup.hlp_importtime import parse_importtime, profile_import, get_importers, report_heaviest_imports
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       164 |        164 |       _json
+import time:       398 |        561 |     json.scanner
+import time:       391 |        952 |   json.decoder
+import time:       419 |        419 |   json.encoder
+import time:       215 |       1585 | json
+"""
+
+
+class TestParseImporttime(unittest.TestCase):
+    def test_tree(self):
+        roots = parse_importtime(IMPORTTIME_OUTPUT)
+        self.assertEqual(len(roots), 1)
+        json_node = roots[0]
+        self.assertEqual((json_node['name'], json_node['self_us'], json_node['cumulative_us']), ('json', 215, 1585))
+        self.assertEqual([child['name'] for child in json_node['children']], ['json.decoder', 'json.encoder'])
+        self.assertEqual(json_node['children'][0]['children'][0]['children'][0]['name'], '_json')
+
+    def test_ignores_other_output(self):
+        self.assertEqual(parse_importtime("Traceback (most recent call last):\n"), [])
+
+
+class TestProfileImport(unittest.TestCase):
+    def test_profile_real_import(self):
+        result = profile_import('json', python_executable=sys.executable)
+        self.assertIsNone(result['error'])
+        self.assertEqual(result['tree']['name'], 'json')
+        self.assertGreaterEqual(result['cumulative_us'], result['self_us'])
+
+    def test_missing_package(self):
+        result = profile_import('surely_not_an_installed_package', python_executable=sys.executable)
+        self.assertIn('ModuleNotFoundError', result['error'])
+
+    def test_preloaded_package(self):
+        result = profile_import('sys', python_executable=sys.executable)  # imported before any user code
+        self.assertTrue(result['preloaded'])
+        self.assertFalse(profile_import('json', python_executable=sys.executable)['preloaded'])
+
+    def test_local_module_is_not_imported(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as folder:
+            with open(os.path.join(folder, 'shadow_module_for_test.py'), 'w') as file:
+                file.write("raise SystemExit('local module executed')\n")
+            os.chdir(folder)
+            try:
+                result = profile_import('shadow_module_for_test', python_executable=sys.executable)
+            finally:
+                os.chdir(cwd)
+        self.assertIn('ModuleNotFoundError', result['error'])
+
+    def test_rejects_non_identifier(self):
+        result = profile_import('os; print(1)')
+        self.assertIsNotNone(result['error'])
+        self.assertIsNone(result['tree'])
+
+
+class TestGetImporters(unittest.TestCase):
+    def test_get_importers(self):
+        results = {'src/b.py': ['numpy.linalg', 'os'], 'src/a.py': ['numpy'], 'src/c.py': ['numpydoc']}
+        self.assertEqual(get_importers(results, 'numpy'), ['src/a.py', 'src/b.py'])
+
+
+
+def fake_profiles(packages, python_executable, max_workers):
+    return {package: {'package': package, 'self_us': 1000, 'cumulative_us': 2000, 'error': None, 'preloaded': False}
+            for package in packages}
+
+
+class TestReportHeaviestImports(unittest.TestCase):
+    @patch('pyprojectsetup.hlp_importtime.profile_imports', side_effect=fake_profiles)
+    def test_relative_imports_and_notebooks(self, mock_profile):
+        with tempfile.TemporaryDirectory() as folder:
+            os.makedirs(os.path.join(folder, 'pkg'))
+            with open(os.path.join(folder, 'pkg', '__init__.py'), 'w') as file:
+                file.write("from . import sibling\nfrom .models import Model\nimport json\n")
+            notebook = os.path.join(folder, 'analysis.ipynb')
+            with open(notebook, 'w') as file:
+                json.dump({'cells': [{'cell_type': 'code', 'metadata': {}, 'outputs': [], 'source': ["import csv\n"]}]}, file)
+            report = report_heaviest_imports(folder)
+        self.assertEqual(mock_profile.call_args[0][0], ['csv', 'json'])
+        self.assertEqual({profile['package']: profile['importers'] for profile in report},
+                         {'csv': [notebook], 'json': [os.path.join(folder, 'pkg', '__init__.py')]})
+
+
+if __name__ == '__main__':
+    unittest.main()
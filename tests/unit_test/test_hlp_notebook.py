@@ -0,0 +1,115 @@
+import unittest
+import io
+import json
+import os
+import tempfile
+
+from pyprojectsetup.hlp_notebook import JsonStream, analyze_notebook, cell_to_python, get_pip_magic_packages, iter_code_cells
+from pyprojectsetup.hlp_package import analyze_py_files, get_unique_packages_from_filepath
+
+
+def write_notebook(folder, notebook, name='analysis.ipynb'):
+    path = os.path.join(folder, name)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(notebook, file, indent=1)
+    return path
+
+
+def code_cell(source, outputs=()):
+    return {'cell_type': 'code', 'execution_count': 1, 'metadata': {}, 'outputs': list(outputs),
+            'source': source.splitlines(keepends=True)}
+
+
+class TestJsonStream(unittest.TestCase):
+    def test_read_and_skip_small_chunks(self):
+        document = {'a': 'x\\"y"é\n', 'b': [1, 2.5, {'c': None, 'd': '}]"'}], 'e': True, 'f': 'kept'}
+        text = json.dumps(document)
+        for chunk_size in (1, 2, 3, 7, 1000):
+            stream = JsonStream(io.StringIO(text), chunk_size=chunk_size)
+            values = {}
+            for key in stream.iter_object():
+                if key == 'b':
+                    stream.skip_value()
+                else:
+                    values[key] = stream.read_value()
+            self.assertEqual(values, {'a': document['a'], 'e': True, 'f': 'kept'}, chunk_size)
+
+
+class TestIterCodeCells(unittest.TestCase):
+    def test_large_outputs_are_skipped(self):
+        image = {'output_type': 'display_data', 'data': {'image/png': 'iVBORw0KGgo\\' * 50000}, 'metadata': {}}
+        notebook = {'cells': [{'cell_type': 'markdown', 'metadata': {}, 'source': ['import markdown_only\n']},
+                              code_cell("import numpy as np\n", outputs=[image]),
+                              code_cell("from pandas import DataFrame\n")],
+                    'metadata': {}, 'nbformat': 4, 'nbformat_minor': 5}
+        with tempfile.TemporaryDirectory() as folder:
+            path = write_notebook(folder, notebook)
+            self.assertEqual(list(iter_code_cells(path, chunk_size=4096)),
+                             ["import numpy as np\n", "from pandas import DataFrame\n"])
+
+    def test_nbformat_3(self):
+        notebook = {'nbformat': 3, 'worksheets': [{'cells': [{'cell_type': 'code', 'input': ['import scipy'],
+                                                              'outputs': []}]}]}
+        with tempfile.TemporaryDirectory() as folder:
+            self.assertEqual(list(iter_code_cells(write_notebook(folder, notebook))), ["import scipy"])
+
+
+class TestCellToPython(unittest.TestCase):
+    def test_magics(self):
+        source = ("%matplotlib inline\n"
+                  "files = !ls\n"
+                  "for file in files:\n"
+                  "    !echo {file}\n"
+                  "%pip install -q requests>=2.0 -i https://example.org/simple 'scikit-learn[alldeps]'\n"
+                  "import requests\n")
+        python, packages = cell_to_python(source)
+        self.assertEqual(packages, ['requests', 'scikit-learn'])
+        self.assertIn("files = None", python)
+        compile(python, 'cell', 'exec')
+
+    def test_cell_magics(self):
+        self.assertEqual(cell_to_python("%%bash\nimport nothing\n"), ('', []))
+        self.assertEqual(cell_to_python("%%time\nimport torch\n"), ('import torch', []))
+
+    def test_pip_magic(self):
+        self.assertEqual(get_pip_magic_packages("!python -m pip install -r requirements.txt polars"), ['polars'])
+        self.assertEqual(get_pip_magic_packages("%pip list"), [])
+
+
+class TestAnalyzeNotebook(unittest.TestCase):
+    def test_analyze(self):
+        notebook = {'cells': [code_cell("import numpy\n"),
+                              code_cell("def broken(:\n"),
+                              code_cell("%pip install seaborn scikit-learn\nimport os.path\n")],
+                    'metadata': {}, 'nbformat': 4, 'nbformat_minor': 5}
+        with tempfile.TemporaryDirectory() as folder:
+            path = write_notebook(folder, notebook)
+            self.assertEqual(analyze_notebook(path), (['numpy', 'os.path'], ['seaborn', 'scikit-learn']))
+            self.assertEqual(analyze_py_files([path]), {'analysis.ipynb': ['numpy', 'os.path']})
+
+    def test_scanned_with_python_files(self):
+        with tempfile.TemporaryDirectory() as folder:
+            write_notebook(folder, {'cells': [code_cell("import matplotlib.pyplot as plt\n")]})
+            with open(os.path.join(folder, 'main.py'), 'w') as file:
+                file.write("import numpy\n")
+            self.assertEqual(get_unique_packages_from_filepath(folder), ['matplotlib', 'numpy'])
+            self.assertEqual(get_unique_packages_from_filepath(folder, flag_notebooks=False), ['numpy'])
+
+    def test_checkpoints_are_excluded(self):
+        with tempfile.TemporaryDirectory() as folder:
+            write_notebook(folder, {'cells': [code_cell("import numpy\n")]})
+            os.makedirs(os.path.join(folder, '.ipynb_checkpoints'))
+            write_notebook(os.path.join(folder, '.ipynb_checkpoints'), {'cells': [code_cell("import scipy\n")]},
+                           name='analysis-checkpoint.ipynb')
+            self.assertEqual(get_unique_packages_from_filepath(folder), ['numpy'])
+
+    def test_invalid_notebook(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'broken.ipynb')
+            with open(path, 'w') as file:
+                file.write('{"cells": [')
+            self.assertTrue(analyze_py_files([path])['broken.ipynb'][0].startswith("Error analyzing file"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import tempfile
+
+from pyprojectsetup.hlp_package import analyze_py_files, get_unique_packages
+from pyprojectsetup.hlp_scan_store import ScanStore, StringTable, scan_files
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(content)
+
+
+class TestStringTable(unittest.TestCase):
+    def test_intern(self):
+        table = StringTable()
+        self.assertEqual([table.intern(name) for name in ['numpy', 'pandas.DataFrame', 'numpy', 'é']], [0, 1, 0, 2])
+        self.assertEqual(list(table), ['numpy', 'pandas.DataFrame', 'é'])
+        self.assertEqual(table.find('pandas.DataFrame'), 1)
+        self.assertIsNone(table.find('scipy'))
+
+
+class TestScanStore(unittest.TestCase):
+    def setUp(self):
+        self.store = ScanStore()
+        self.store.add_file('a.py', ['os', 'numpy', 'numpy.linalg', 'collections.defaultdict'])
+        self.store.add_file('b.py', ['numpy', 'pandas.DataFrame'])
+        self.store.add_file('broken.py', [], error="invalid syntax")
+
+    def test_interned_columns(self):
+        self.assertEqual(len(self.store.modules), 5)  # numpy is stored once
+        self.assertEqual(list(self.store.roots), ['os', 'numpy', 'collections', 'pandas'])
+        self.assertEqual(list(self.store.offsets), [0, 4, 6, 6])
+        self.assertEqual(self.store.get_imports('b.py'), ['numpy', 'pandas.DataFrame'])
+        self.assertIsNone(self.store.get_imports('missing.py'))
+
+    def test_root_packages(self):
+        self.assertEqual(self.store.get_unique_packages(), ['collections', 'numpy', 'os', 'pandas'])
+        self.assertEqual(self.store.get_unique_packages(exclude_packages=['os', 'unknown']), ['collections', 'numpy', 'pandas'])
+        only_a = self.store.get_root_ids([0]) - self.store.get_root_ids([1])
+        self.assertEqual(self.store.get_packages(only_a), ['collections', 'os'])
+        self.assertEqual(self.store.get_importers('numpy'), ['a.py', 'b.py'])
+
+    def test_to_dict(self):
+        self.assertEqual(self.store.to_dict()['broken.py'], ["Error analyzing file: invalid syntax"])
+        self.assertEqual(self.store.to_dict()['a.py'], ['os', 'numpy', 'numpy.linalg', 'collections.defaultdict'])
+
+    def test_errors_are_kept_per_row(self):
+        self.store.add_file('broken.py', ['os'])  # a second file with the same name, in another folder
+        self.assertEqual(self.store.errors, {2: "invalid syntax"})
+        self.assertEqual(self.store.to_dict()['broken.py'], ['os'])
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'scan.store')
+            self.store.save(path)
+            loaded = ScanStore.load(path)
+            self.assertIsInstance(loaded.imports, memoryview)  # read in place from the mapping
+            self.assertEqual(loaded.to_dict(), self.store.to_dict())
+            self.assertEqual(loaded.errors, {2: "invalid syntax"})
+            self.assertEqual(loaded.get_unique_packages(), self.store.get_unique_packages())
+
+            loaded.add_file('c.py', ['scipy', 'numpy'])  # copied on the first change
+            self.assertEqual(loaded.get_imports('c.py'), ['scipy', 'numpy'])
+            self.assertEqual(len(loaded.modules), 6)
+            loaded.close()
+
+    def test_load_invalid(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'scan.store')
+            write(path, "not a store at all, longer than the header of a store file for sure" * 2)
+            with self.assertRaises(ValueError):
+                ScanStore.load(path)
+
+
+class TestScanFiles(unittest.TestCase):
+    def test_same_result_as_analyze_py_files(self):
+        with tempfile.TemporaryDirectory() as folder:
+            paths = [os.path.join(folder, 'main.py'), os.path.join(folder, 'pkg', 'util.py'), os.path.join(folder, 'bad.py')]
+            write(paths[0], "import os\nfrom numpy import array\nimport numpy as np\n")
+            write(paths[1], "from pandas import DataFrame, Series\n")
+            write(paths[2], "def broken(:\n")
+            store = scan_files(paths, flag_full_path=True)
+            self.assertEqual(store.to_dict(), analyze_py_files(paths, flag_full_path=True))
+            self.assertEqual(list(store.errors), [2])
+            self.assertEqual(store.get_unique_packages(), ['numpy', 'os', 'pandas'])
+            self.assertEqual(get_unique_packages(analyze_py_files(paths[:2])), store.get_unique_packages())
+
+
+if __name__ == '__main__':
+    unittest.main()
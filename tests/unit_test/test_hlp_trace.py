@@ -0,0 +1,65 @@
+import unittest
+import io
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from pyprojectsetup import hlp_trace
+from pyprojectsetup.hlp_package import analyze_py_files, find_files
+
+
+class TestTrace(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for name in ('a.py', 'b.py'):
+            with open(os.path.join(self.tmp.name, name), 'w') as file:
+                file.write("import numpy\n")
+
+    def tearDown(self):
+        hlp_trace.disable()
+        self.tmp.cleanup()
+
+    def test_disabled_is_a_no_op(self):
+        self.assertFalse(hlp_trace.is_enabled())
+        self.assertIs(hlp_trace.span('parse'), hlp_trace.span('walk'))
+        hlp_trace.count('files_scanned')
+        self.assertIsNone(hlp_trace.disable())
+
+    def test_scan_is_traced(self):
+        tracer = hlp_trace.enable()
+        analyze_py_files(find_files(self.tmp.name, '*.py'))
+        hlp_trace.disable()
+
+        self.assertEqual([span[0] for span in tracer.spans], ['walk', 'parse', 'parse'])
+        self.assertEqual(tracer.counters, {'files_scanned': 2, 'bytes_read': 26})
+
+    def test_sinks(self):
+        trace_path = os.path.join(self.tmp.name, 'trace.json')
+        summary = io.StringIO()
+        hlp_trace.enable([hlp_trace.ChromeTraceSink(trace_path), hlp_trace.SummarySink(summary)])
+        with hlp_trace.span('http', 'classify', package='numpy'):
+            hlp_trace.count('requests')
+        hlp_trace.disable()
+
+        with open(trace_path, 'r') as file:
+            events = json.load(file)['traceEvents']
+        self.assertEqual(events[0]['name'], 'http')
+        self.assertEqual(events[0]['ph'], 'X')
+        self.assertEqual(events[0]['args'], {'package': 'numpy'})
+        self.assertEqual(events[1], dict(events[1], ph='C', args={'requests': 1}))
+        self.assertIn('http', summary.getvalue())
+        self.assertIn('requests', summary.getvalue())
+
+    def test_path_args_are_written(self):
+        trace_path = os.path.join(self.tmp.name, 'trace.json')
+        hlp_trace.enable([hlp_trace.ChromeTraceSink(trace_path)])
+        find_files(Path(self.tmp.name), '*.py')
+        hlp_trace.disable()
+
+        with open(trace_path, 'r') as file:
+            self.assertEqual(json.load(file)['traceEvents'][0]['args']['path'], self.tmp.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import tempfile
+
+from pyprojectsetup.hlp_unused import find_unused_requirements, get_import_names, prune_requirements_txt
+
+
+def make_dist(top_level=None, files=()):
+    dist = MagicMock()
+    dist.read_text.return_value = top_level
+    dist.files = [MagicMock(parts=tuple(path.split('/'))) for path in files]
+    return dist
+
+
+class TestGetImportNames(unittest.TestCase):
+    def test_top_level(self):
+        self.assertEqual(get_import_names('Foo-Bar', {'foo-bar': make_dist(top_level="foobar\n")}), {'foobar'})
+
+    def test_record_files(self):
+        dist = make_dist(files=['six.py', 'mypkg/__init__.py', 'mypkg-1.0.dist-info/RECORD', '../../bin/tool'])
+        self.assertEqual(get_import_names('mypkg', {'mypkg': dist}), {'six', 'mypkg'})
+
+    def test_not_installed(self):
+        self.assertEqual(get_import_names('scikit-learn', {}), {'sklearn'})
+        self.assertEqual(get_import_names('my-lib', {}), {'my_lib'})
+        self.assertEqual(get_import_names('my-lib', {}, flag_guess=False), set())
+
+
+@patch('pyprojectsetup.hlp_unused.load_distributions', return_value={'pandas': make_dist(top_level="pandas\n")})
+class TestFindUnusedRequirements(unittest.TestCase):
+    def test_find_unused(self, mock_load):
+        used, unused, allowed, unresolved = find_unused_requirements(
+            ['numpy', 'PyYAML', 'pandas', 'pytest', 'celery-plugin', 'python-jose'], ['numpy', 'yaml', 'os', 'jose'],
+            allow_list=['celery_plugin'])
+        self.assertEqual(used, ['numpy', 'PyYAML'])
+        self.assertEqual(unused, ['pandas'])
+        self.assertEqual(allowed, ['pytest', 'celery-plugin'])
+        self.assertEqual(unresolved, ['python-jose'])  # not installed: its import name `jose` is unknown
+
+
+class TestPruneRequirements(unittest.TestCase):
+    def test_prune(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            requirements_path = os.path.join(tmp, 'requirements.txt')
+            output_path = os.path.join(tmp, 'pruned.txt')
+            with open(requirements_path, 'w') as file:
+                file.write("# runtime\nnumpy==1.26\nPandas>=2 ; python_version > '3.8'\n-r dev.txt\n")
+
+            removed = prune_requirements_txt(requirements_path, ['pandas'], output_path=output_path)
+
+            self.assertEqual(removed, ["Pandas>=2 ; python_version > '3.8'"])
+            with open(output_path, 'r') as file:
+                self.assertEqual(file.read(), "# runtime\nnumpy==1.26\n-r dev.txt\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+
+from pyprojectsetup.hlp_watch import IncrementalScanner, InotifyWatcher, PollingWatcher, watch_requirements
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(content)
+
+
+class TestIncrementalScanner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        write(os.path.join(self.root, 'a.py'), "import numpy\nimport os\n")
+        write(os.path.join(self.root, 'pkg', 'b.py'), "from pandas import DataFrame\nimport numpy.linalg\n")
+        write(os.path.join(self.root, 'venv', 'lib', 'c.py'), "import decoy\n")
+        self.scanner = IncrementalScanner(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scan_all(self):
+        self.assertEqual(self.scanner.scan_all(), ['numpy', 'pandas'])
+
+    def test_update_file(self):
+        self.scanner.scan_all()
+        write(os.path.join(self.root, 'pkg', 'b.py'), "import scipy\n")
+        self.assertEqual(self.scanner.update([os.path.join(self.root, 'pkg', 'b.py')]), (['scipy'], ['pandas']))
+        self.assertEqual(self.scanner.packages(), ['numpy', 'scipy'])
+
+    def test_package_still_imported_elsewhere(self):
+        self.scanner.scan_all()
+        os.remove(os.path.join(self.root, 'a.py'))
+        self.assertEqual(self.scanner.update([os.path.join(self.root, 'a.py')]), ([], []))
+
+    def test_deleted_folder(self):
+        self.scanner.scan_all()
+        shutil.rmtree(os.path.join(self.root, 'pkg'))
+        self.assertEqual(self.scanner.update([os.path.join(self.root, 'pkg')]), ([], ['pandas']))
+
+    def test_excluded_folder(self):
+        self.scanner.scan_all()
+        self.assertEqual(self.scanner.update([os.path.join(self.root, 'venv', 'lib', 'c.py')]), ([], []))
+
+    def test_parent_folder_is_not_excluded(self):
+        root = os.path.join(self.root, 'myvenvtools', 'proj')  # 'venv' above the project does not exclude it
+        write(os.path.join(root, 'main.py'), "import scipy\n")
+        self.assertEqual(IncrementalScanner(root).scan_all(), ['scipy'])
+        self.assertEqual(list(PollingWatcher(root)._snapshot), [os.path.join(root, 'main.py')])
+
+
+class TestWatchers(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        write(os.path.join(self.root, 'a.py'), "import numpy\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_watcher(self, watcher):
+        try:
+            write(os.path.join(self.root, 'new', 'b.py'), "import pandas\n")
+            write(os.path.join(self.root, 'venv', 'c.py'), "import decoy\n")
+            os.remove(os.path.join(self.root, 'a.py'))
+            changed = set()
+            deadline = time.monotonic() + 5
+            while os.path.join(self.root, 'a.py') not in changed and time.monotonic() < deadline:
+                changed |= watcher.poll(0.1)
+        finally:
+            watcher.close()
+        scanner = IncrementalScanner(self.root)
+        scanner.imports = {os.path.join(self.root, 'a.py'): {'numpy'}}
+        scanner.counts = {'numpy': 1}
+        self.assertEqual(scanner.update(changed), (['pandas'], ['numpy']))
+        self.assertFalse(any('venv' in path for path in changed))
+
+    def test_polling_watcher(self):
+        self.check_watcher(PollingWatcher(self.root, interval=0.05))
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), "inotify is Linux only")
+    def test_inotify_watcher(self):
+        self.check_watcher(InotifyWatcher(self.root))
+
+
+class TestWatchRequirements(unittest.TestCase):
+    def run_watch(self, root, new_files, **kwargs):
+        """Watch root, write new_files (name -> content) and return the updates and the categorize_packages mock."""
+        updates, stop_event = [], threading.Event()
+        with patch('pyprojectsetup.hlp_watch.categorize_packages', side_effect=lambda names, **kwargs: (list(names), [], [])) as mock_categorize:
+            thread = threading.Thread(target=watch_requirements, args=(root,),
+                                      kwargs=dict({'requirements_path': os.path.join(root, 'requirements.txt'),
+                                                   'debounce': 0.1, 'flag_polling': True, 'interval': 0.05,
+                                                   'on_update': updates.append, 'stop_event': stop_event}, **kwargs))
+            thread.start()
+            time.sleep(0.2)
+            for name, content in new_files.items():
+                write(os.path.join(root, name), content)
+            deadline = time.monotonic() + 5
+            while not updates and time.monotonic() < deadline:
+                time.sleep(0.05)
+            stop_event.set()
+            thread.join()
+        return updates, mock_categorize
+
+    def test_new_import_is_reported_once(self):
+        with tempfile.TemporaryDirectory() as root:
+            write(os.path.join(root, 'a.py'), "import numpy\n")
+            # a burst of changes is processed as one batch
+            updates, mock_categorize = self.run_watch(root, {f'gen_{index}.py': "import pandas\n" for index in range(20)})
+
+            self.assertEqual(len(updates), 1)
+            self.assertEqual(updates[0]['added'], ['pandas'])
+            self.assertEqual(updates[0]['missing'], ['pandas'])
+            self.assertEqual([call[0][0] for call in mock_categorize.call_args_list], [['numpy'], ['pandas']])
+
+    def test_apply_skips_pinned_requirements(self):
+        with tempfile.TemporaryDirectory() as root:
+            write(os.path.join(root, 'a.py'), "import numpy\n")
+            write(os.path.join(root, 'requirements.txt'), "numpy\nPandas==2.0\n")
+            updates, _ = self.run_watch(root, {'b.py': "import pandas\nimport scipy\n"}, flag_apply=True)
+
+            self.assertEqual(updates[0]['missing'], ['scipy'])
+            with open(os.path.join(root, 'requirements.txt')) as file:
+                self.assertEqual(file.read().split(), ['numpy', 'Pandas==2.0', 'scipy'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -38,7 +38,7 @@ class TestInstallRequirements(unittest.TestCase):
     def test_install_requirements_success(self, mock_check_call):
         # Simulate successful installation
         requirements_path = "requirements.txt"
-        install_requirements(requirements_path)
+        self.assertTrue(install_requirements(requirements_path))
         requirements_path = os.path.abspath(requirements_path)
         mock_check_call.assert_called_once_with([sys.executable, '-m', 'pip', 'install', '-r', requirements_path])
 
@@ -48,7 +48,7 @@ class TestInstallRequirements(unittest.TestCase):
         mock_check_call.side_effect = subprocess.CalledProcessError(1, 'cmd')
 
         with self.assertLogs() as captured:
-            install_requirements("requirements.txt")
+            self.assertFalse(install_requirements("requirements.txt"))
             self.assertIn("An error occurred during package installation", captured.records[0].getMessage())
 
     @patch('subprocess.check_call')
@@ -176,7 +176,7 @@ class TestInstallRequirementsOneAtTime(unittest.TestCase):
     @patch('os.path.isfile', return_value=True)
     @patch('builtins.open', new_callable=mock_open, read_data="package1\npackage2")
     def test_installation_failure(self, mock_open, mock_isfile, mock_subprocess):
-        install_requirements_onepackage_at_a_time('requirements.txt')
+        self.assertEqual(install_requirements_onepackage_at_a_time('requirements.txt'), (['package1'], ['package2']))
         # Here you could check if the logger was called with expected error messages
         # This would involve mocking the logger used in your function and verifying it was called correctly
 
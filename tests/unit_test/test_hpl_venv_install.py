@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import sys
+import tempfile
+import zipfile
+
+from pyprojectsetup.hpl_venv_install import _seed_file_lock, create_virtual_env, get_venv_version, get_venv_site_packages, prepare_seed, seed_virtual_env
+
+
+def make_venv(venv_path, version="3.11.7"):
+    os.makedirs(get_venv_site_packages(venv_path, "3.11"))
+    os.makedirs(os.path.join(venv_path, "bin"), exist_ok=True)
+    with open(os.path.join(venv_path, "pyvenv.cfg"), "w") as file:
+        file.write(f"home = /usr/bin\ninclude-system-site-packages = false\nversion = {version}\n")
+
+
+def make_wheel(wheel_dir, name):
+    wheel_path = os.path.join(wheel_dir, f"{name}-1.0-py3-none-any.whl")
+    with zipfile.ZipFile(wheel_path, "w") as archive:
+        archive.writestr(f"{name}/__init__.py", "")
+        archive.writestr(f"{name}-1.0.dist-info/entry_points.txt", f"[console_scripts]\n{name} = {name}:main\n")
+    return wheel_path
+
+
+class TestSeed(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.seed_dir = os.path.join(self.tmp.name, "seed")
+        self.venv_path = os.path.join(self.tmp.name, "venv")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def fake_download(self, python_executable, python_version, wheel_dir):
+        make_wheel(wheel_dir, "pip")
+        return True
+
+    def test_get_venv_version(self):
+        make_venv(self.venv_path)
+        self.assertEqual(get_venv_version(self.venv_path), "3.11")
+
+    def test_prepare_seed_is_reused(self):
+        with patch('pyprojectsetup.hpl_venv_install._download_seed_wheels', side_effect=self.fake_download) as mock_download:
+            first = prepare_seed(sys.executable, "3.11", seed_dir=self.seed_dir)
+            second = prepare_seed(sys.executable, "3.11", seed_dir=self.seed_dir)
+        self.assertEqual(first, second)
+        self.assertEqual(mock_download.call_count, 1)
+        self.assertTrue(os.path.isfile(os.path.join(first, "unpacked", "pip-1.0-py3-none-any", "pip", "__init__.py")))
+
+    def test_prepare_seed_is_refreshed_when_too_old(self):
+        with patch('pyprojectsetup.hpl_venv_install._download_seed_wheels', side_effect=self.fake_download) as mock_download:
+            first = prepare_seed(sys.executable, "3.11", seed_dir=self.seed_dir)
+            second = prepare_seed(sys.executable, "3.11", seed_dir=self.seed_dir, max_age_days=0)
+        self.assertNotEqual(first, second)
+        self.assertEqual(mock_download.call_count, 2)
+        self.assertFalse(os.path.exists(first))
+
+    @unittest.skipIf(sys.platform == "win32", "file locks are only used on posix")
+    def test_seed_in_use_is_kept(self):
+        with patch('pyprojectsetup.hpl_venv_install._download_seed_wheels', side_effect=self.fake_download):
+            first = prepare_seed(sys.executable, "3.11", seed_dir=self.seed_dir)
+            with _seed_file_lock(os.path.dirname(first)):  # an environment is being seeded from the first seed
+                second = prepare_seed(sys.executable, "3.11", seed_dir=self.seed_dir, max_age_days=0)
+            self.assertTrue(os.path.isdir(first))
+            third = prepare_seed(sys.executable, "3.11", seed_dir=self.seed_dir, max_age_days=0)
+        self.assertFalse(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+        self.assertTrue(os.path.isdir(third))
+
+    @unittest.skipIf(sys.platform == "win32", "console scripts are only written on posix")
+    def test_seed_virtual_env_links_files(self):
+        make_venv(self.venv_path)
+        with patch('pyprojectsetup.hpl_venv_install._download_seed_wheels', side_effect=self.fake_download):
+            self.assertTrue(seed_virtual_env(self.venv_path, sys.executable, seed_dir=self.seed_dir))
+
+        site_packages = get_venv_site_packages(self.venv_path, "3.11")
+        self.assertTrue(os.path.isfile(os.path.join(site_packages, "pip", "__init__.py")))
+        with open(os.path.join(self.venv_path, "bin", "pip"), "r") as file:
+            self.assertIn("from pip import main", file.read())
+
+    @patch('pyprojectsetup.hpl_venv_install.seed_virtual_env', return_value=True)
+    @patch('subprocess.run')
+    def test_create_virtual_env_seeded(self, mock_run, mock_seed):
+        mock_run.return_value = MagicMock(returncode=0)
+        self.assertTrue(create_virtual_env(sys.executable, self.venv_path, flag_seed=True, seed_dir=self.seed_dir))
+        mock_run.assert_called_once_with([sys.executable, "-m", "venv", self.venv_path, "--without-pip"],
+                                         stdout=-1, stderr=-1, text=True)
+        mock_seed.assert_called_once_with(self.venv_path, sys.executable, seed_dir=self.seed_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
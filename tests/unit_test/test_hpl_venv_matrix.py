@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import tempfile
+
+from pyprojectsetup.hpl_venv_matrix import build_venv_matrix, provision_venv, provision_venv_matrix
+
+
+class TestBuildVenvMatrix(unittest.TestCase):
+    def test_cartesian_product(self):
+        matrix = build_venv_matrix(['3.9', '3.11'], {'base': ['requirements.txt'], 'dev': ['pytest']}, base_dir='envs')
+        self.assertEqual([entry['name'] for entry in matrix], ['py3.9-base', 'py3.9-dev', 'py3.11-base', 'py3.11-dev'])
+        self.assertEqual(matrix[0]['venv_path'], os.path.join('envs', 'py3.9-base'))
+        self.assertEqual(matrix[3]['requirements'], ['pytest'])
+
+    def test_no_requirement_set(self):
+        matrix = build_venv_matrix(['3.11'], {})
+        self.assertEqual(matrix[0]['name'], 'py3.11-bare')
+        self.assertEqual(matrix[0]['requirements'], [])
+
+    def test_same_interpreter_twice(self):
+        matrix = build_venv_matrix(['3.11', '3.11'], {'base': []})
+        self.assertEqual([entry['name'] for entry in matrix], ['py3.11-base'])
+
+    def test_interpreters_sharing_a_name(self):
+        with tempfile.TemporaryDirectory() as folder:
+            pythons = [os.path.join(folder, 'a', 'python3.11'), os.path.join(folder, 'b', 'python3.11')]
+            for python in pythons:
+                os.makedirs(os.path.dirname(python))
+                open(python, 'w').close()
+            with self.assertRaises(ValueError):
+                build_venv_matrix(pythons, {'base': []})
+
+
+class TestProvisionVenv(unittest.TestCase):
+    def setUp(self):
+        self.entry = {'name': 'py3.11-dev', 'python': '3.11', 'venv_path': 'envs/py3.11-dev', 'requirements': ['pytest']}
+
+    @patch('pyprojectsetup.hpl_venv_matrix.resolve_python', return_value=None)
+    def test_interpreter_not_found(self, mock_resolve):
+        result = provision_venv(self.entry)
+        self.assertFalse(result['created'])
+        self.assertIn('not found', result['error'])
+
+    @patch('subprocess.run')
+    @patch('pyprojectsetup.hpl_venv_install.create_virtual_env', return_value=True)
+    @patch('pyprojectsetup.hpl_venv_matrix.resolve_python', return_value='/usr/bin/python3.11')
+    def test_install_uses_shared_cache(self, mock_resolve, mock_create, mock_run):
+        mock_run.return_value = MagicMock(returncode=0)
+
+        result = provision_venv(self.entry, cache_dir='/tmp/shared-cache')
+
+        self.assertTrue(result['created'])
+        self.assertTrue(result['installed'])
+        self.assertIsNone(result['error'])
+        command = mock_run.call_args[0][0]
+        self.assertEqual(command[1:], ['-m', 'pip', 'install', 'pytest'])
+        self.assertEqual(mock_run.call_args[1]['env']['PIP_CACHE_DIR'], '/tmp/shared-cache')
+
+    @patch('subprocess.run')
+    @patch('pyprojectsetup.hpl_venv_install.create_virtual_env', return_value=True)
+    @patch('pyprojectsetup.hpl_venv_matrix.resolve_python', return_value='/usr/bin/python3.11')
+    def test_install_failure(self, mock_resolve, mock_create, mock_run):
+        mock_run.return_value = MagicMock(returncode=1, stderr="No matching distribution")
+
+        result = provision_venv(self.entry)
+
+        self.assertFalse(result['installed'])
+        self.assertEqual(result['returncode'], 1)
+        self.assertEqual(result['error'], "No matching distribution")
+
+
+class TestProvisionVenvMatrix(unittest.TestCase):
+    @patch('os.makedirs')
+    @patch('pyprojectsetup.hpl_venv_matrix.provision_venv', side_effect=lambda entry, cache_dir, flag_seed: {'name': entry['name']})
+    def test_results_keep_matrix_order(self, mock_provision, mock_makedirs):
+        matrix = build_venv_matrix(['3.9', '3.10', '3.11', '3.12'], {'base': []})
+        results = provision_venv_matrix(matrix, max_workers=4, cache_dir='cache')
+        self.assertEqual([result['name'] for result in results], [entry['name'] for entry in matrix])
+        self.assertEqual(mock_provision.call_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()